@@ -1,3 +1,4 @@
+import hmac
 from typing import Any, Dict
 
 import logging
@@ -9,7 +10,8 @@ from .config import settings
 logger = logging.getLogger("app.auth")
 
 
-def get_current_openid(
+# 纯内存计算，声明为 async 避免 FastAPI 把每次依赖解析派发到线程池
+async def get_current_openid(
     x_openid: str = Header(None, alias="X-OpenId"),
     openid: str = Header(None, alias="openid"),
 ) -> str:
@@ -26,6 +28,24 @@ def get_current_openid(
     return user_openid
 
 
+def require_admin(
+    x_admin_token: str = Header(None, alias="X-Admin-Token"),
+    authorization: str = Header(None, alias="Authorization"),
+) -> None:
+    """
+    校验内部管理接口令牌，未配置 ADMIN_TOKEN 时一律拒绝。
+    支持 X-Admin-Token 或 Authorization: Bearer（Prometheus 抓取配置只能设置后者）
+    """
+    token = x_admin_token
+    if not token and authorization and authorization[:7].lower() == "bearer ":
+        token = authorization[7:].strip()
+    if not settings.admin_token or not token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    # 按字节比较：compare_digest 遇到非 ASCII 字符串会抛 TypeError
+    if not hmac.compare_digest(token.encode("utf-8"), settings.admin_token.encode("utf-8")):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+
+
 def fake_wechat_code2session(code: str) -> str:
     """调用微信官方 code2Session 获取 openid。"""
     if not code:
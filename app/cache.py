@@ -0,0 +1,90 @@
+"""
+进程内缓存
+- LRU 淘汰 + TTL 过期，线程安全（同步路由运行在线程池中）
+- 记录命中/未命中次数，便于评估缓存收益
+- 只在当前进程内有效，多 worker 之间的一致性依靠较短的 TTL 兜底
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from .config import settings
+
+
+class TTLCache:
+    """带命中统计的 LRU + TTL 缓存。"""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # key -> (过期时间, 值)，按最近使用顺序排列
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """命中返回值，未命中或已过期返回 None。"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """删除所有 key 满足条件的条目（遍历全部条目，仅用于低频的失效操作）。"""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# 团队成员身份缓存：(team_id, openid) -> True，只缓存成员身份，非成员与团队不存在均不缓存
+membership_cache = TTLCache(
+    maxsize=settings.membership_cache_size,
+    ttl_seconds=settings.membership_cache_ttl,
+)
+
+
+def invalidate_membership(
+    team_ids: tuple[str, ...] | list[str] = (), openids: tuple[str, ...] | list[str] = ()
+) -> None:
+    """团队成员关系变化后（事务提交之后）调用，清除相关团队或用户的缓存条目。"""
+    team_id_set = set(team_ids)
+    openid_set = set(openids)
+    if not team_id_set and not openid_set:
+        return
+    membership_cache.invalidate_where(
+        lambda key: key[0] in team_id_set or key[1] in openid_set
+    )
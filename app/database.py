@@ -1,10 +1,22 @@
+import asyncio
 import logging
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Optional
 
-from sqlalchemy import create_engine, event
-from sqlalchemy.engine.url import make_url
+from sqlalchemy import create_engine, event, exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import settings
+from .metrics import HistogramFamily, registry
 
 logger = logging.getLogger("app.database")
 # 统一日志格式，带日期时间，便于排查线上问题
@@ -23,40 +35,275 @@ class Base(DeclarativeBase):
 _db_url = make_url(settings.database_url)
 logger.info("Using database: %s", _db_url.render_as_string(hide_password=True))
 
+# 会话时区在建连时通过 init_command 设置，不再单独执行一次 SET
+_MYSQL_INIT_COMMAND = "SET time_zone = '+08:00'"
+
+
+class PoolWaitStats:
+    """记录从连接池获取连接的等待耗时与超时次数。"""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+class _TimedPoolMixin:
+    """在连接池取连接处计时，包含池满时排队等待的时间。"""
+
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start, timed_out=False)
+        return connection
+
+
+def _timed_pool_class(base: type) -> type:
+    # 每个引擎一个子类，等待统计互不干扰
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"wait_stats": PoolWaitStats()})
+
+
+def _engine_options(url: URL) -> dict:
+    options = {
+        "pool_pre_ping": True,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "echo": False,  # 关闭全量 echo，改为自定义精简日志
+    }
+    if url.get_backend_name() == "mysql":
+        options["connect_args"] = {"init_command": _MYSQL_INIT_COMMAND}
+    return options
+
+
 engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
+    _db_url,
+    poolclass=_timed_pool_class(QueuePool),
     future=True,
-    echo=False,  # 关闭全量 echo，改为自定义精简日志
+    **_engine_options(_db_url),
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
+# 同步驱动 -> 异步驱动
+_ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+
+def _async_database_url() -> URL:
+    if settings.async_database_url:
+        return make_url(settings.async_database_url)
+    backend = _db_url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise RuntimeError(f"未知的异步驱动，请配置 ASYNC_DATABASE_URL: {backend}")
+    return _db_url.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}")
+
+
+# 异步引擎供 async 路由使用，请求不再占用线程池；同步引擎保留给后台线程与运维脚本
+_async_db_url = _async_database_url()
+async_engine = create_async_engine(
+    _async_db_url,
+    poolclass=_timed_pool_class(AsyncAdaptedQueuePool),
+    **_engine_options(_async_db_url),
+)
+# 提交后不过期对象：异步会话中访问过期属性会触发隐式 IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
-@event.listens_for(engine, "connect")
-def _set_timezone(dbapi_connection, connection_record) -> None:
-    """确保每个连接使用东八区，避免时间字段滞后。"""
-    cursor = dbapi_connection.cursor()
+def prewarm_pool(count: int = settings.db_pool_prewarm) -> None:
+    """启动时预先建立同步连接，避免首批请求承担建连耗时。"""
+    connections = []
     try:
-        cursor.execute("SET time_zone = '+08:00'")
+        for _ in range(min(count, settings.db_pool_size)):
+            connections.append(engine.connect())
     finally:
-        cursor.close()
+        for connection in connections:
+            connection.close()
 
 
-@event.listens_for(engine, "after_cursor_execute")
-def _log_sql(conn, cursor, statement, parameters, context, executemany) -> None:
-    """仅打印业务 SQL，过滤掉模式探测等噪声。"""
-    stmt_upper = statement.strip().upper()
-    noisy_prefixes = (
-        "SELECT DATABASE()",
-        "SELECT @@SQL_MODE",
-        "SELECT @@LOWER_CASE_TABLE_NAMES",
-        "DESCRIBE ",
-        "PRAGMA ",
-        "SHOW FULL TABLES",
+async def prewarm_async_pool(count: int = settings.db_pool_prewarm) -> None:
+    """启动时并发建立异步连接，归还后留在池中。"""
+    connections = await asyncio.gather(
+        *(async_engine.connect() for _ in range(min(count, settings.db_pool_size)))
     )
-    if any(stmt_upper.startswith(prefix) for prefix in noisy_prefixes):
+    for connection in connections:
+        await connection.close()
+
+
+def pool_status(target: Engine) -> dict:
+    """连接池实时状态：空闲、借出、溢出连接数及取连接等待统计。"""
+    pool = target.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **pool.wait_stats.snapshot(),
+    }
+
+
+def _pool_metric(*keys: str):
+    """生成 /metrics 抓取时读取两个连接池状态的回调，keys 为 pool_status 中的字段。"""
+
+    def collect() -> dict[tuple, float]:
+        values = {}
+        for name, target in (("sync", engine), ("async", async_engine.sync_engine)):
+            stats = pool_status(target)
+            # 池内连接尚未全部建立时 overflow 为负数，对外按 0 计
+            stats["overflow"] = max(stats["overflow"], 0)
+            for key in keys:
+                values[(name, key) if len(keys) > 1 else (name,)] = stats[key]
+        return values
+
+    return collect
+
+
+registry.gauge(
+    "db_pool_connections",
+    "连接池连接数（checked_in 空闲，checked_out 借出，overflow 溢出）",
+    ("engine", "state"),
+    collect=_pool_metric("checked_in", "checked_out", "overflow"),
+)
+registry.gauge(
+    "db_pool_size", "连接池常驻连接数上限", ("engine",), collect=_pool_metric("size")
+)
+registry.gauge(
+    "db_pool_checkouts_total",
+    "从连接池取连接的次数",
+    ("engine",),
+    collect=_pool_metric("checkouts"),
+    type_name="counter",
+)
+registry.gauge(
+    "db_pool_checkout_timeouts_total",
+    "取连接超时次数",
+    ("engine",),
+    collect=_pool_metric("timeouts"),
+    type_name="counter",
+)
+
+
+# 模式探测等框架内部语句，不计入统计
+_NOISY_PREFIXES = (
+    "SELECT DATABASE()",
+    "SELECT @@SQL_MODE",
+    "SELECT @@LOWER_CASE_TABLE_NAMES",
+    "DESCRIBE ",
+    "PRAGMA ",
+    "SHOW FULL TABLES",
+)
+# IN (...) 展开后的占位符列表，归一为同一形状
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?|%\(\w+\)s)\s*,)+\s*(?:%s|\?|%\(\w+\)s)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_PARAM_MAX_LENGTH = 32
+
+# 按语句形状统计的 SQL 耗时直方图
+sql_stats = HistogramFamily(max_series=500)
+# 当前请求执行的 SQL 条数，由访问日志中间件在请求开始时设置（线程池/greenlet 中会沿用同一上下文）
+_request_query_count: ContextVar[Optional[list[int]]] = ContextVar("request_query_count", default=None)
+
+
+def start_query_count() -> list[int]:
+    """开始统计当前请求的 SQL 条数，返回的计数器在请求结束时读取 counter[0]。"""
+    counter = [0]
+    _request_query_count.set(counter)
+    return counter
+
+
+@lru_cache(maxsize=2048)
+def _statement_shape(statement: str) -> Optional[str]:
+    """语句归一化后的形状；框架内部语句返回 None。"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    if shape.upper().startswith(_NOISY_PREFIXES):
+        return None
+    return _PLACEHOLDER_LIST.sub("(?...)", shape)
+
+
+def _redact_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if settings.sql_log_params != "truncate":
+        return f"<{type(value).__name__}>"
+    text = str(value)
+    return text if len(text) <= _PARAM_MAX_LENGTH else text[:_PARAM_MAX_LENGTH] + "..."
+
+
+def _redact_params(parameters: Any, executemany: bool) -> Any:
+    """日志中的参数：默认只保留类型，SQL_LOG_PARAMS=truncate 时保留截断后的值；批量执行只记第一组。"""
+    if executemany and parameters:
+        return [_redact_params(parameters[0], False), f"... {len(parameters)} rows"]
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    # 开始时间挂在本次执行的 context 上：语句抛错时随 context 一起释放，不会在连接上累积
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany) -> None:
+    """记录耗时直方图；只打印慢查询与按比例抽样的语句，参数脱敏。"""
+    start_time = getattr(context, "_query_start_time", None)
+    if start_time is None:
+        return
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    shape = _statement_shape(statement)
+    if shape is None:
         return
-    logger.info("SQL: %s | params=%s", statement, parameters)
+    sql_stats.observe(shape, elapsed_ms)
+    counter = _request_query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+    if elapsed_ms >= settings.slow_query_ms:
+        logger.warning(
+            "slow SQL %.1fms: %s | params=%s",
+            elapsed_ms,
+            shape,
+            _redact_params(parameters, executemany),
+        )
+    elif settings.sql_log_sample_rate and random.random() < settings.sql_log_sample_rate:
+        logger.info(
+            "SQL %.1fms: %s | params=%s",
+            elapsed_ms,
+            shape,
+            _redact_params(parameters, executemany),
+        )
 
 
 def get_db():
@@ -66,3 +313,7 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,68 @@
+"""
+列表接口条件请求（ETag / If-None-Match）
+- 用 COUNT(*) + MAX(updated_at) 作为廉价校验值，只走索引，不加载行
+- 校验值未变时直接返回 304，跳过查询和序列化
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# updated_at 只精确到秒：最近一次写入未满该秒数时不下发 ETag，避免同一秒内两次修改被误判为未变化
+ETAG_SETTLE_SECONDS = 2
+
+
+async def scope_version(
+    db: AsyncSession, model, *criteria
+) -> tuple[int, Optional[datetime]]:
+    """返回范围内的 (行数, 最大 updated_at)。"""
+    result = await db.execute(
+        select(func.count(), func.max(model.updated_at)).where(*criteria)
+    )
+    count, max_updated_at = result.one()
+    return count, max_updated_at
+
+
+def make_etag(*parts: Any) -> Optional[str]:
+    """根据校验值生成弱 ETag；存在刚写入的数据时返回 None。"""
+    settle_before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        seconds=ETAG_SETTLE_SECONDS
+    )
+    for part in parts:
+        if isinstance(part, datetime):
+            naive = part.replace(tzinfo=None) if part.tzinfo else part
+            if naive > settle_before:
+                return None
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # 弱比较：忽略 W/ 前缀
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def conditional_response(
+    request: Request, response: Response, *parts: Any
+) -> Optional[Response]:
+    """
+    为列表响应设置 ETag
+
+    客户端缓存仍有效时返回 304 响应，调用方直接返回它；否则返回 None 继续正常处理。
+    """
+    etag = make_etag(*parts)
+    if etag is None:
+        return None
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
@@ -0,0 +1,159 @@
+"""
+后台任务选主
+- 基于 scheduler_leases 表的租约 + 心跳，多个 worker 进程中只有一个执行任务
+- leader 失联后，其他进程在租约过期后自动接管
+"""
+import asyncio
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import case, func, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from .database import SessionLocal
+from .models import SchedulerLease
+
+logger = logging.getLogger("app.leader")
+
+# 当前进程的持有者标识
+HOLDER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# 续约使用独立线程，避免被耗时的推送任务阻塞导致租约过期
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="leader")
+
+
+class LeaderElection:
+    """单个后台任务的租约选主。"""
+
+    def __init__(self, name: str, ttl_seconds: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.is_leader = False
+
+    def try_acquire(self) -> bool:
+        """续约或抢占已过期的租约，成功返回 True。时间统一取数据库时钟，避免多机时钟偏差。"""
+        expires_at = func.timestampadd(text("SECOND"), self.ttl_seconds, func.now())
+        with SessionLocal() as db:
+            result = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(
+                        SchedulerLease.holder == HOLDER_ID,
+                        SchedulerLease.expires_at < func.now(),
+                    ),
+                )
+                # MySQL 按顺序赋值，acquired_at 必须在 holder 之前计算
+                .ordered_values(
+                    (
+                        SchedulerLease.acquired_at,
+                        case(
+                            (SchedulerLease.holder == HOLDER_ID, SchedulerLease.acquired_at),
+                            else_=func.now(),
+                        ),
+                    ),
+                    (SchedulerLease.holder, HOLDER_ID),
+                    (SchedulerLease.renewed_at, func.now()),
+                    (SchedulerLease.expires_at, expires_at),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                db.commit()
+                return True
+            if db.get(SchedulerLease, self.name) is not None:
+                return False
+
+            # 首次运行，租约行还不存在
+            db.add(
+                SchedulerLease(
+                    name=self.name,
+                    holder=HOLDER_ID,
+                    acquired_at=func.now(),
+                    renewed_at=func.now(),
+                    expires_at=expires_at,
+                )
+            )
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return False
+            return True
+
+    def release(self) -> None:
+        """主动让出租约，使其他进程立即可以接管。"""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        with SessionLocal() as db:
+            db.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == HOLDER_ID)
+                .values(expires_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+    def holds_lease(self) -> bool:
+        """按数据库确认租约仍由本进程持有且未过期；is_leader 只在续约时更新，长任务在每步之前用它复核。"""
+        if not self.is_leader:
+            return False
+        with SessionLocal() as db:
+            holder = db.scalar(
+                select(SchedulerLease.holder).where(
+                    SchedulerLease.name == self.name,
+                    SchedulerLease.holder == HOLDER_ID,
+                    SchedulerLease.expires_at > func.now(),
+                )
+            )
+        return holder is not None
+
+    def get_lease(self) -> Optional[SchedulerLease]:
+        with SessionLocal() as db:
+            return db.get(SchedulerLease, self.name)
+
+    async def run(self, job: Callable[[], Awaitable[None]]) -> None:
+        """循环续约；成为 leader 时启动 job，失去租约时取消 job。"""
+        loop = asyncio.get_running_loop()
+        renew_interval = max(self.ttl_seconds / 3, 1)
+        task: Optional[asyncio.Task] = None
+        try:
+            while True:
+                try:
+                    acquired = await loop.run_in_executor(_executor, self.try_acquire)
+                except Exception as exc:
+                    # 无法续约时按失去租约处理，避免与接管者同时执行
+                    logger.warning("lease %s renew failed: %s", self.name, exc)
+                    acquired = False
+
+                if acquired and not self.is_leader:
+                    logger.info("lease %s acquired by %s", self.name, HOLDER_ID)
+                    task = asyncio.create_task(job())
+                elif not acquired and self.is_leader:
+                    logger.warning("lease %s lost by %s", self.name, HOLDER_ID)
+                    if task is not None:
+                        task.cancel()
+                        task = None
+                self.is_leader = acquired
+
+                await asyncio.sleep(renew_interval)
+        finally:
+            if task is not None:
+                task.cancel()
+
+
+notifier_leader = LeaderElection("notifier", settings.notifier_lease_ttl)
+
+
+def shutdown_leader() -> None:
+    """进程退出时让出租约并关闭续约线程。"""
+    try:
+        notifier_leader.release()
+    except Exception as exc:
+        logger.warning("lease release failed: %s", exc)
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,105 @@
 """
 日志管理模块
 - 单独的日志文件夹
-- 按天分割日志文件
+- 按天分割日志文件，轮转后的文件 gzip 压缩
 - 自动保留一周的日志
-- 控制日志总大小不超过2G
+- 控制日志总大小不超过2G（启动时及运行中定期清理）
+- 请求路径上只把日志放入有界队列，由后台线程写文件和控制台（含根记录器，覆盖 app.* 模块日志）
 """
+import atexit
+import gzip
 import logging
+import queue
+import shutil
 import sys
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from datetime import datetime, timedelta
+from typing import Iterator
 import os
 
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境
+    fcntl = None
+
+from .config import settings
+
+
+# 多 worker 共用 logs/ 目录时，轮转与清理通过目录下的锁文件串行化
+ROTATE_LOCK_NAME = ".rotate.lock"
+RETENTION_LOCK_NAME = ".retention.lock"
+# 轮转后待压缩文件的后缀；压缩完成后变为 .gz
+PENDING_SUFFIX = ".pending"
+# 超过该时长仍未压缩的轮转文件（进程在压缩中途退出、旧版本留下的未压缩文件）由清理任务补压缩
+STALE_ARCHIVE_SECONDS = 600
+
+
+@contextmanager
+def _file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """跨进程文件锁；非阻塞模式下锁被占用时返回 False。不支持 fcntl 的平台不加锁。"""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _compress_file(source: Path) -> Path:
+    """gzip 压缩轮转文件，保留原修改时间；先写临时文件再改名，中途退出不会留下残缺的 .gz。"""
+    target = Path(str(source).removesuffix(PENDING_SUFFIX) + ".gz")
+    # 轮转线程与清理任务可能同时压缩同一文件，临时文件按进程和线程区分
+    temp = target.with_name(f"{target.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    mtime = source.stat().st_mtime
+    with open(source, "rb") as src, gzip.open(temp, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.utime(temp, (mtime, mtime))
+    os.replace(temp, target)
+    source.unlink(missing_ok=True)
+    return target
+
+
+def _compress_in_background(source: Path) -> None:
+    try:
+        _compress_file(source)
+    except FileNotFoundError:
+        # 清理任务已经补压缩过
+        pass
+    except OSError as e:
+        print(f"压缩日志失败 {source.name}: {e}", file=sys.stderr)
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    """
+    TimedRotatingFileHandler 的 rotator：改名为待压缩文件，由后台线程压缩为 dest.gz
+
+    多个进程各自持有同一日志文件的处理器，都会在同一时刻触发轮转。
+    先完成轮转的进程留下 dest.gz（或压缩中的 dest.pending），其余进程看到后不再改名，
+    直接重新打开新文件，避免把新周期的日志当作旧周期覆盖掉。
+    """
+    pending = dest + PENDING_SUFFIX
+    with _file_lock(Path(source).parent / ROTATE_LOCK_NAME):
+        if os.path.exists(dest + ".gz") or os.path.exists(pending):
+            return
+        if not os.path.exists(source):
+            # delay=True 且本周期没有写入过
+            return
+        os.rename(source, pending)
+    threading.Thread(
+        target=_compress_in_background, args=(Path(pending),), name="log-compress", daemon=True
+    ).start()
+
 
 class LogManager:
     """日志管理器"""
@@ -28,33 +116,86 @@ class LogManager:
         self.log_dir = Path(log_dir)
         self.max_total_size_bytes = int(max_total_size_gb * 1024 * 1024 * 1024)
         self.keep_days = keep_days
+        # 日志文件夹当前总大小（字节），每次扫描后更新
+        self.total_size = 0
+        # 已轮转文件不再写入：文件名 -> (修改时间, 大小)，只在第一次见到时 stat
+        self._archived: dict[str, tuple[float, int]] = {}
         
         # 创建日志目录
         self.log_dir.mkdir(exist_ok=True)
+
+    @staticmethod
+    def _is_growing(name: str) -> bool:
+        # 正在写入的日志与压缩中的临时文件，大小会变化
+        return name.endswith(".log") or name.endswith(".tmp")
+
+    def _scan(self) -> list[tuple[Path, float, int]]:
+        """
+        扫描日志文件，更新总大小
+        
+        Returns:
+            [(文件路径, 修改时间, 大小), ...] 按修改时间排序（最旧的在前）
+        """
+        seen: dict[str, tuple[float, int]] = {}
+        with os.scandir(self.log_dir) as entries:
+            for entry in entries:
+                if ".log" not in entry.name or not entry.is_file():
+                    continue
+                cached = None if self._is_growing(entry.name) else self._archived.get(entry.name)
+                if cached is None:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # 其他进程刚删除或压缩完
+                        continue
+                    cached = (stat.st_mtime, stat.st_size)
+                seen[entry.name] = cached
+        # 其他进程删除的文件随之移出缓存
+        self._archived = {
+            name: value for name, value in seen.items() if not self._is_growing(name)
+        }
+        self.total_size = sum(size for _, size in seen.values())
+        files = [(self.log_dir / name, mtime, size) for name, (mtime, size) in seen.items()]
+        files.sort(key=lambda x: x[1])
+        return files
+
+    def _forget(self, file: Path, size: int) -> None:
+        self._archived.pop(file.name, None)
+        self.total_size -= size
         
     def get_log_files(self) -> list[tuple[Path, float]]:
         """
-        获取所有日志文件及其大小
+        获取所有日志文件及其修改时间
         
         Returns:
             [(文件路径, 修改时间), ...] 按修改时间排序
         """
-        log_files = []
-        for file in self.log_dir.glob("*.log*"):
-            if file.is_file():
-                stat = file.stat()
-                log_files.append((file, stat.st_mtime))
-        
-        # 按修改时间排序（最旧的在前）
-        log_files.sort(key=lambda x: x[1])
-        return log_files
+        return [(file, mtime) for file, mtime, _ in self._scan()]
     
     def get_total_size(self) -> int:
         """获取日志文件夹总大小（字节）"""
-        total_size = 0
-        for file, _ in self.get_log_files():
-            total_size += file.stat().st_size
-        return total_size
+        self._scan()
+        return self.total_size
+
+    def compress_stale_archives(self):
+        """补压缩遗留的未压缩轮转文件，清除压缩中途退出留下的临时文件"""
+        stale_before = time.time() - STALE_ARCHIVE_SECONDS
+        for file, mtime, size in self._scan():
+            name = file.name
+            if name.endswith(".log") or name.endswith(".gz") or mtime >= stale_before:
+                continue
+            try:
+                if name.endswith(".tmp"):
+                    file.unlink()
+                    self._forget(file, size)
+                    continue
+                target = _compress_file(file)
+                self._forget(file, size)
+                print(f"压缩日志: {name} -> {target.name}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"压缩日志文件失败 {name}: {e}")
     
     def clean_old_logs(self):
         """清理旧日志"""
@@ -63,62 +204,170 @@ class LogManager:
         cutoff_timestamp = cutoff_time.timestamp()
         
         deleted_count = 0
-        for file, mtime in self.get_log_files():
-            if mtime < cutoff_timestamp:
+        for file, mtime, size in self._scan():
+            # 正在写入的文件交给轮转处理
+            if mtime < cutoff_timestamp and not file.name.endswith(".log"):
                 try:
                     file.unlink()
+                    self._forget(file, size)
                     deleted_count += 1
                     print(f"删除过期日志: {file.name}")
+                except FileNotFoundError:
+                    self._forget(file, size)
                 except Exception as e:
                     print(f"删除日志文件失败 {file.name}: {e}")
         
         if deleted_count > 0:
             print(f"共删除 {deleted_count} 个过期日志文件")
     
-    def clean_by_size(self):
+    def clean_by_size(self, verbose: bool = True):
         """根据大小清理日志，确保总大小不超过限制"""
-        total_size = self.get_total_size()
+        log_files = self._scan()
+        total_size = self.total_size
         
         if total_size <= self.max_total_size_bytes:
-            print(f"日志总大小: {total_size / (1024**3):.2f} GB (未超限)")
+            if verbose:
+                print(f"日志总大小: {total_size / (1024**3):.2f} GB (未超限)")
             return
         
         print(f"日志总大小 {total_size / (1024**3):.2f} GB 超过限制 {self.max_total_size_bytes / (1024**3):.2f} GB")
         print("开始清理最旧的日志文件...")
         
-        log_files = self.get_log_files()
         deleted_count = 0
         
-        for file, _ in log_files:
-            if total_size <= self.max_total_size_bytes:
+        for file, _, file_size in log_files:
+            if self.total_size <= self.max_total_size_bytes:
                 break
             
             try:
-                file_size = file.stat().st_size
                 file.unlink()
-                total_size -= file_size
+                self._forget(file, file_size)
                 deleted_count += 1
                 print(f"删除日志: {file.name} (释放 {file_size / (1024**2):.2f} MB)")
+            except FileNotFoundError:
+                self._forget(file, file_size)
             except Exception as e:
                 print(f"删除日志文件失败 {file.name}: {e}")
         
         print(f"清理完成，删除 {deleted_count} 个文件")
-        print(f"当前日志总大小: {total_size / (1024**3):.2f} GB")
+        print(f"当前日志总大小: {self.total_size / (1024**3):.2f} GB")
     
-    def cleanup(self):
-        """执行完整的清理流程"""
-        print("\n" + "="*50)
-        print("开始日志清理")
-        print("="*50)
-        
-        # 1. 先删除过期日志
-        self.clean_old_logs()
-        
-        # 2. 检查并按大小清理
-        self.clean_by_size()
+    def cleanup(self, verbose: bool = True):
+        """
+        执行完整的清理流程
         
-        print("="*50)
-        print("日志清理完成\n")
+        多进程共用日志目录时同一时刻只有一个进程执行，其余直接跳过；
+        verbose=False 用于后台定期清理，只在有文件被压缩或删除时输出。
+        """
+        with _file_lock(self.log_dir / RETENTION_LOCK_NAME, blocking=False) as acquired:
+            if not acquired:
+                if verbose:
+                    print("其他进程正在清理日志，跳过")
+                return
+            
+            if verbose:
+                print("\n" + "="*50)
+                print("开始日志清理")
+                print("="*50)
+            
+            # 1. 删除过期日志
+            self.clean_old_logs()
+            
+            # 2. 补压缩遗留的轮转文件
+            self.compress_stale_archives()
+            
+            # 3. 检查并按大小清理
+            self.clean_by_size(verbose=verbose)
+            
+            if verbose:
+                print("="*50)
+                print("日志清理完成\n")
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    有界队列前端，队列满时按策略处理：
+    - block: 阻塞等待后台线程消费，不丢日志
+    - drop: 直接丢弃新日志
+    - count: 丢弃并计数，队列恢复后补记一条丢弃数量的警告
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "count"):
+        super().__init__(log_queue)
+        if overflow not in ("block", "drop", "count"):
+            raise ValueError(f"LOG_QUEUE_OVERFLOW 必须是 block/drop/count: {overflow}")
+        self.overflow = overflow
+        self.dropped = 0
+        self._pending_report = 0
+        self._drop_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        if self.overflow == "count" and self._pending_report:
+            self._report_dropped(record)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self._pending_report += 1
+
+    def _report_dropped(self, record: logging.LogRecord) -> None:
+        with self._drop_lock:
+            count, self._pending_report = self._pending_report, 0
+        if not count:
+            return
+        notice = logging.makeLogRecord(
+            {
+                "name": record.name,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"日志队列已满，丢弃了 {count} 条日志",
+            }
+        )
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._drop_lock:
+                self._pending_report += count
+
+
+# 每个日志记录器一组 (记录器, 队列前端, 后台写线程)
+_queues: list[tuple[logging.Logger, BoundedQueueHandler, QueueListener]] = []
+
+
+def _daily_file_handler(
+    log_path: Path, name: str, formatter: logging.Formatter, delay: bool = False
+) -> logging.Handler:
+    # 文件处理器 - 按天分割，保留备份
+    file_handler = TimedRotatingFileHandler(
+        filename=log_path / f"{name}.log",
+        when='midnight',  # 每天午夜分割
+        interval=1,  # 每1天
+        backupCount=0,  # 过期与超限文件由 LogManager 统一清理（多进程安全）
+        encoding='utf-8',
+        delay=delay,  # 首次写入时才创建文件
+    )
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    file_handler.suffix = "%Y-%m-%d"  # 备份文件后缀
+    file_handler.rotator = _gzip_rotator  # 轮转后压缩为 .gz
+    return file_handler
+
+
+def _attach_queue(logger: logging.Logger, *handlers: logging.Handler) -> None:
+    """文件/控制台由后台线程写入，记录日志的线程只做入队。"""
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    queue_handler = BoundedQueueHandler(log_queue, overflow=settings.log_queue_overflow)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    if not _queues:
+        # 非 Web 进程（如运维脚本）退出时同样写完队列
+        atexit.register(shutdown_logging)
+    _queues.append((logger, queue_handler, listener))
+    logger.addHandler(queue_handler)
 
 
 def setup_logger(name: str = "display_date", log_dir: str = "logs") -> logging.Logger:
@@ -150,30 +399,90 @@ def setup_logger(name: str = "display_date", log_dir: str = "logs") -> logging.L
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
-    # 文件处理器 - 按天分割，保留备份
-    file_handler = TimedRotatingFileHandler(
-        filename=log_path / f"{name}.log",
-        when='midnight',  # 每天午夜分割
-        interval=1,  # 每1天
-        backupCount=7,  # 保留7天
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    file_handler.suffix = "%Y-%m-%d"  # 备份文件后缀
-    
     # 控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     
-    # 添加处理器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    _attach_queue(logger, _daily_file_handler(log_path, name, formatter), console_handler)
     
     return logger
 
 
+def setup_root_logger() -> logging.Logger:
+    """
+    根记录器同样经队列输出：app.database、app.notifier 等模块日志及第三方库日志都会传播到这里
+    
+    沿用已配置的处理器（app.database 中的 basicConfig），尚未配置时按相同格式输出到 stderr；
+    之后再调用 basicConfig 时根记录器已有处理器，不会重复添加同步输出。
+    """
+    root = logging.getLogger()
+    if any(isinstance(handler, BoundedQueueHandler) for handler in root.handlers):
+        return root
+    handlers = list(root.handlers)
+    if not handlers:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(
+            logging.Formatter(
+                fmt="%(asctime)s %(levelname)s %(name)s - %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
+        )
+        handlers = [console_handler]
+        root.setLevel(logging.INFO)
+    for handler in handlers:
+        root.removeHandler(handler)
+    _attach_queue(root, *handlers)
+    return root
+
+
+def setup_access_logger(name: str = "access", log_dir: str = "logs") -> logging.Logger:
+    """
+    结构化访问日志记录器：每行一条 JSON，只写文件，不向上级记录器传播
+    """
+    log_path = Path(log_dir)
+    log_path.mkdir(exist_ok=True)
+
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if logger.handlers:
+        return logger
+
+    formatter = logging.Formatter("%(message)s")
+    _attach_queue(logger, _daily_file_handler(log_path, name, formatter, delay=True))
+    return logger
+
+
+def log_queue_stats() -> dict:
+    """日志队列当前积压与累计丢弃条数。"""
+    return {
+        "queued": sum(handler.queue.qsize() for _, handler, _ in _queues),
+        "dropped": sum(handler.dropped for _, handler, _ in _queues),
+    }
+
+
+def shutdown_logging() -> None:
+    """
+    停止后台写日志线程
+    
+    先把记录器上的队列前端换回实际的处理器，再写完队列中剩余的日志：
+    停止之后（如 atexit、关闭阶段）记录的日志改为同步写入，不会堆积在无人消费的队列里，
+    LOG_QUEUE_OVERFLOW=block 时也不会因队列满而永久阻塞。处理器由 logging 在进程退出时关闭。
+    """
+    while _queues:
+        logger, queue_handler, listener = _queues.pop()
+        # 一次性替换处理器列表，切换过程中的日志既不会丢失也不会重复
+        logger.handlers = [
+            handler for handler in logger.handlers if handler is not queue_handler
+        ] + list(listener.handlers)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+
+
 # 创建全局日志管理器和日志记录器
 log_manager = LogManager(log_dir="logs", max_total_size_gb=2.0, keep_days=7)
+setup_root_logger()
 logger = setup_logger()
+access_logger = setup_access_logger()
@@ -4,15 +4,31 @@ from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from fastapi.staticfiles import StaticFiles
-from .database import Base, engine, SessionLocal
-from .routers import auth, items, teams, notify, webhook, upload, barcode, wardrobe
-from .notifier import notifier_loop
-from .logger import logger, log_manager
+from .config import settings
+from .database import Base, async_engine, engine, prewarm_async_pool, prewarm_pool
+from .routers import auth, items, teams, notify, webhook, upload, barcode, wardrobe, admin
+from .notifier import notifier_loop, shutdown_notifier
+from .leader import notifier_leader, shutdown_leader
+from .logger import logger, log_manager, shutdown_logging
 from .middleware import LoggingMiddleware
+from .profiler import ProfilingMiddleware
+from .response import FastJSONResponse
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Display Date API", version="0.1.0")
+# 所有 response_model 路由默认使用 orjson 序列化（未安装时退回标准库 json）
+app = FastAPI(
+    title="Display Date API",
+    version="0.1.0",
+    default_response_class=FastJSONResponse,
+)
+
+# 保存后台任务引用，避免被垃圾回收
+_background_tasks: set[asyncio.Task] = set()
+
+# 单请求分析放在日志中间件内层，可读取请求 ID；未配置密钥时不安装
+if settings.profile_secret:
+    app.add_middleware(ProfilingMiddleware)
 
 # 添加日志中间件（必须在CORS之后）
 app.add_middleware(LoggingMiddleware)
@@ -36,6 +52,8 @@ app.include_router(webhook.router)
 app.include_router(upload.router)
 app.include_router(barcode.router)
 app.include_router(wardrobe.router)
+app.include_router(admin.router)
+app.include_router(admin.metrics_router)
 
 
 @app.get("/", response_class=PlainTextResponse)
@@ -46,18 +64,53 @@ def read_root() -> str:
 """
 
 
+async def _log_retention_loop():
+    """运行期间定期清理日志，长时间运行的 worker 也不会超出日志总大小限制。"""
+    while True:
+        await asyncio.sleep(settings.log_retention_interval)
+        try:
+            await asyncio.to_thread(log_manager.cleanup, verbose=False)
+        except Exception as e:
+            logger.error(f"日志清理失败: {e}")
+
+
+def _spawn_background(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 @app.on_event("startup")
 async def _start_notifier():
     logger.info("应用启动中...")
     
-    # 清理日志
+    # 清理日志（可能需要补压缩旧的轮转文件，放到线程中执行）
     try:
-        log_manager.cleanup()
+        await asyncio.to_thread(log_manager.cleanup)
     except Exception as e:
         logger.error(f"日志清理失败: {e}")
     
-    # 启动通知循环
-    asyncio.create_task(notifier_loop())
+    # 预建数据库连接，避免首批请求承担建连耗时
+    try:
+        await prewarm_async_pool()
+        await asyncio.to_thread(prewarm_pool)
+    except Exception as e:
+        logger.error(f"数据库连接预热失败: {e}")
+    
+    # 启动通知循环：多 worker 时只有持有租约的进程执行，阻塞 I/O 在 notifier 自己的线程池中执行
+    _spawn_background(notifier_leader.run(notifier_loop))
+    # 定期日志清理：各 worker 都启动，通过日志目录下的锁文件保证同一时刻只有一个在执行
+    _spawn_background(_log_retention_loop())
     
     logger.info("应用启动完成")
 
+
+@app.on_event("shutdown")
+async def _stop_notifier():
+    for task in list(_background_tasks):
+        task.cancel()
+    shutdown_leader()
+    shutdown_notifier()
+    await async_engine.dispose()
+    shutdown_logging()
+
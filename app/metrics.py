@@ -0,0 +1,300 @@
+"""
+进程内指标
+- 固定桶直方图：记录次数、总耗时、最大值，按桶上界估算分位数
+- 按标签（SQL 形状、路由等）分组，标签数量有上限，超出的归入 OTHER_LABEL
+- Counter / Gauge / Histogram 注册表，按 Prometheus 文本格式输出（/metrics）
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+# 直方图桶上界（毫秒），最后隐含一个 +Inf 桶
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+OTHER_LABEL = "__other__"
+
+
+class LatencyHistogram:
+    """单个标签的直方图，由调用方加锁；bounds 为各桶上界，观测值、total、max 与其单位相同（由调用方决定）。"""
+
+    __slots__ = ("bounds", "count", "total", "max", "buckets")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS) -> None:
+        self.bounds = bounds
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+
+    def quantile(self, q: float) -> float:
+        """估算分位数：返回第一个累计占比达到 q 的桶上界，落在 +Inf 桶时返回最大值。"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= target:
+                if index < len(self.bounds):
+                    return float(min(self.bounds[index], self.max))
+                break
+        return self.max
+
+    def snapshot(self) -> dict:
+        """按毫秒输出的统计，仅用于以毫秒观测的直方图（HistogramFamily）。"""
+        return {
+            "count": self.count,
+            "total_ms": self.total,
+            "avg_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+        }
+
+
+class HistogramFamily:
+    """按标签分组的耗时直方图，线程安全。"""
+
+    def __init__(self, max_series: int = 500):
+        self.max_series = max_series
+        self._series: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label: str, elapsed_ms: float) -> None:
+        with self._lock:
+            histogram = self._series.get(label)
+            if histogram is None:
+                if len(self._series) >= self.max_series:
+                    label = OTHER_LABEL
+                histogram = self._series.setdefault(label, LatencyHistogram())
+            histogram.observe(elapsed_ms)
+
+    def snapshot(self, top: Optional[int] = None) -> list[dict]:
+        """按总耗时倒序返回各标签的统计。"""
+        with self._lock:
+            rows = [{"label": label, **h.snapshot()} for label, h in self._series.items()]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows[:top] if top else rows
+
+
+# ============ Prometheus 指标 ============
+
+# 请求级耗时桶（秒）
+DEFAULT_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(_Metric):
+    """只增计数器。"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """瞬时值；传入 collect 时在抓取时调用它取值，返回 {标签值元组: 数值}。"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], dict[tuple, float]]] = None,
+        type_name: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type_name = type_name
+        self._collect = collect
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def render(self) -> list[str]:
+        if self._collect is not None:
+            values = list(self._collect().items())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """固定桶直方图（单位秒），输出累计 _bucket、_sum、_count。"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS_SECONDS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, LatencyHistogram] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            histogram = self._series.get(labelvalues)
+            if histogram is None:
+                histogram = self._series[labelvalues] = LatencyHistogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = [
+                (labels, list(h.buckets), h.total, h.count)
+                for labels, h in self._series.items()
+            ]
+        lines = self.header()
+        for labels, bucket_counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，按注册顺序输出。"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标重复注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS_SECONDS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus 文本格式（version 0.0.4）。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# 未匹配任何路由的请求（404 扫描等）归为一类，避免路由标签无限增长
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP 请求数", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时", ("method", "route")
+)
+NOTIFIER_PASS_DURATION = registry.histogram(
+    "notifier_pass_duration_seconds",
+    "一轮到期提醒推送的耗时",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300),
+)
+NOTIFIER_MESSAGES = registry.counter(
+    "notifier_messages_total", "到期提醒订阅消息数", ("result",)
+)
+BARCODE_LOOKUPS = registry.counter(
+    "barcode_lookups_total", "条形码查询命中的数据源（miss 为全部未命中）", ("source",)
+)
+IMAGE_COMPRESS_DURATION = registry.histogram(
+    "image_compress_duration_seconds", "上传图片压缩耗时"
+)
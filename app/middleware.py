@@ -4,70 +4,213 @@
 - 错误日志记录
 - 请求耗时统计
 - 统一异常处理
+
+纯 ASGI 实现：不为每个请求创建额外任务和内存流，流式响应（如 /uploads）原样透传
+ACCESS_LOG_FORMAT=json 时每个请求在 logs/access.log 写一行 JSON，按路由模板聚合
+每个请求按 (方法, 路由模板, 状态码) 计入 /metrics 的请求数与耗时直方图
 """
+import hashlib
+import json
+import logging
+import re
 import time
-import traceback
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from .logger import logger
-from .response import ResponseCode, ResponseMessage
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import status
+from starlette.datastructures import URL, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .database import start_query_count
+from .logger import access_logger, logger
+from .metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, UNMATCHED_ROUTE
+from .response import FastJSONResponse, ResponseCode, ResponseMessage, orjson
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# 沿用客户端/网关传入的请求 ID，格式不合法时重新生成
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+# /metrics 的 method 标签取值
+_METRIC_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE")
+)
+OTHER_METHOD = "OTHER"
+
+
+def _request_id(scope: Scope) -> str:
+    for key, value in scope["headers"]:
+        if key == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if _VALID_REQUEST_ID.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+def _openid_hash(scope: Scope) -> Optional[str]:
+    """openid 只记录哈希，便于按用户聚合而不落明文。"""
+    for key, value in scope["headers"]:
+        if key in (b"x-openid", b"openid") and value:
+            return hashlib.blake2b(value, digest_size=8).hexdigest()
+    return None
+
+
+def _route_template(scope: Scope, root_path: str) -> Optional[str]:
+    """匹配到的路由模板（如 /items/{item_id}）；静态目录按挂载点归为一类。"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or getattr(route, "path", None)
+    if scope.get("root_path", "") != root_path:
+        return scope["root_path"] + "/{path}"
+    return None
+
+
+def _record_metrics(scope: Scope, root_path: str, status_code: int, start_time: float) -> None:
+    route = _route_template(scope, root_path) or UNMATCHED_ROUTE
+    # 方法名由客户端决定，非标准方法归为一类，避免标签无限增长
+    method = scope["method"] if scope["method"] in _METRIC_METHODS else OTHER_METHOD
+    HTTP_REQUESTS.inc(method, route, str(status_code))
+    HTTP_REQUEST_DURATION.observe(time.perf_counter() - start_time, method, route)
+
+
+def _dumps(entry: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(entry).decode("utf-8")
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+class _LazyURL:
+    """日志参数：只有日志真正输出时才拼接完整 URL。"""
 
+    __slots__ = ("scope", "_url")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self._url = None
+
+    def __str__(self) -> str:
+        if self._url is None:
+            self._url = str(URL(scope=self.scope))
+        return self._url
+
+
+class LoggingMiddleware:
     """日志记录中间件"""
-    
-    async def dispatch(self, request: Request, call_next):
-        # 记录请求开始
-        start_time = time.time()
-        
-        # 获取请求信息
-        method = request.method
-        url = str(request.url)
-        client_host = request.client.host if request.client else "unknown"
-        
-        # 记录请求
-        logger.info(f"请求开始 | {method} {url} | 客户端: {client_host}")
-        
-        try:
-            # 处理请求
-            response = await call_next(request)
-            
-            # 计算耗时
-            process_time = time.time() - start_time
-            
-            # 记录响应
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        url = _LazyURL(scope)
+        structured = settings.access_log_format == "json"
+        request_id = _request_id(scope)
+        # 路由中可通过 request.state.request_id 读取
+        scope.setdefault("state", {})["request_id"] = request_id
+        root_path = scope.get("root_path", "")
+        if structured:
+            query_counter = start_query_count()
+        else:
+            client = scope.get("client")
             logger.info(
-                f"请求完成 | {method} {url} | "
-                f"状态码: {response.status_code} | "
-                f"耗时: {process_time:.3f}s"
+                "请求开始 | %s %s | 客户端: %s", method, url, client[0] if client else "unknown"
             )
-            
-            # 添加响应头
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            return response
-            
+
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        response_started = False
+        bytes_out = 0
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code, response_started, bytes_out
+            if message["type"] == "http.response.start":
+                # 与原实现一致：耗时统计到响应头就绪为止
+                response_started = True
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+                headers.append(REQUEST_ID_HEADER, request_id)
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
         except Exception as exc:
-            # 计算耗时
-            process_time = time.time() - start_time
-            
-            # 记录错误
             logger.error(
-                f"请求异常 | {method} {url} | "
-                f"耗时: {process_time:.3f}s | "
-                f"错误: {str(exc)}\n"
-                f"堆栈跟踪:\n{traceback.format_exc()}"
+                "请求异常 | %s %s | 请求ID: %s | 耗时: %.3fs | 错误: %s",
+                method,
+                url,
+                request_id,
+                time.perf_counter() - start_time,
+                exc,
+                exc_info=True,
             )
-            
-            # 返回统一格式的错误响应
-            return JSONResponse(
+            # 响应头已发出时无法再返回错误响应，交给服务器断开连接
+            if response_started:
+                raise
+            response = FastJSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "code": ResponseCode.INTERNAL_ERROR,
                     "message": ResponseMessage.INTERNAL_ERROR,
                     "data": {
-                        "detail": str(exc) if logger.level == 10 else None
-                    }
+                        "detail": str(exc) if logger.level == logging.DEBUG else None
+                    },
+                },
+                headers={REQUEST_ID_HEADER: request_id},
+            )
+            await response(scope, receive, send)
+            _record_metrics(scope, root_path, status_code, start_time)
+            if structured:
+                self._log_access(
+                    scope, root_path, request_id, start_time,
+                    status_code, len(response.body), query_counter[0],
+                )
+            return
+
+        _record_metrics(scope, root_path, status_code, start_time)
+        if structured:
+            self._log_access(
+                scope, root_path, request_id, start_time, status_code, bytes_out, query_counter[0]
+            )
+            return
+        logger.info(
+            "请求完成 | %s %s | 状态码: %d | 耗时: %.3fs",
+            method,
+            url,
+            status_code,
+            time.perf_counter() - start_time,
+        )
+
+    @staticmethod
+    def _log_access(
+        scope: Scope,
+        root_path: str,
+        request_id: str,
+        start_time: float,
+        status_code: int,
+        bytes_out: int,
+        db_queries: int,
+    ) -> None:
+        """访问日志只包含固定字段，不含完整 URL 与查询参数。"""
+        access_logger.info(
+            _dumps(
+                {
+                    "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "route": _route_template(scope, root_path),
+                    "status": status_code,
+                    "latency_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                    "db_queries": db_queries,
+                    "bytes_out": bytes_out,
+                    "openid_hash": _openid_hash(scope),
                 }
             )
+        )
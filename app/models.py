@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from uuid import uuid4
 
 from sqlalchemy import (
@@ -8,18 +9,33 @@ from sqlalchemy import (
     Date,
     Numeric,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     func,
 )
 from sqlalchemy.dialects.mysql import JSON
-from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from .database import Base
 
 
+EXPIRE_DATE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+
+def parse_expire_date(date_str: Optional[str]) -> Optional[datetime]:
+    """严格解析日期：YYYY-MM-DD 或 YYYY-MM-DD HH:MM，按 UTC 处理，返回 naive datetime；失败返回 None。"""
+    if not date_str:
+        return None
+    for fmt in EXPIRE_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
 class TimestampMixin:
     """通用创建/更新时间字段，使用东八区会话时区。"""
 
@@ -35,12 +51,33 @@ class Team(TimestampMixin, Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     name = Column(String(255), nullable=False)
     owner_openid = Column(String(255), nullable=False, index=True)
-    member_openids = Column(
-        MutableList.as_mutable(JSON), nullable=False, default=list
-    )
     invite_code = Column(String(64), nullable=False, index=True)
     quota = Column(Integer, nullable=False, default=5)
     items = relationship("Item", back_populates="team", cascade="all, delete-orphan")
+    members = relationship(
+        "TeamMember",
+        back_populates="team",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="TeamMember.joined_at",
+    )
+
+    @property
+    def member_openids(self) -> list[str]:
+        return [member.openid for member in self.members]
+
+
+class TeamMember(Base):
+    """团队成员表 - (team_id, openid) 主键，openid 单独索引用于查询“我加入的团队”"""
+    __tablename__ = "team_members"
+
+    team_id = Column(
+        String(36), ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True
+    )
+    openid = Column(String(255), primary_key=True, index=True)
+    joined_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    team = relationship("Team", back_populates="members")
 
 
 class Item(TimestampMixin, Base):
@@ -52,6 +89,8 @@ class Item(TimestampMixin, Base):
     name = Column(String(255), nullable=False)
     category = Column(String(255), nullable=True)
     expire_date = Column(String(255), nullable=True)
+    # expire_date 的类型化副本，写入 expire_date 时自动同步，供到期筛选/排序走索引
+    expire_at = Column(DateTime, nullable=True, comment='到期时间(UTC)')
     note = Column(String(1024), nullable=True)
     barcode = Column(String(255), nullable=True)
     product_image = Column(String(1024), nullable=True)
@@ -64,6 +103,29 @@ class Item(TimestampMixin, Base):
 
     team = relationship("Team", back_populates="items")
 
+    @validates("expire_date")
+    def _sync_expire_at(self, key, value):
+        self.expire_at = parse_expire_date(value)
+        return value
+
+    __table_args__ = (
+        Index("ix_items_deleted_expire_at", "deleted", "expire_at"),
+        # 到期提醒只扫描未提醒的行，已提醒的历史数据不进入索引范围；按 (expire_at, id) 游标分批读取
+        Index("ix_items_deleted_notified_expire", "deleted", "notified_at", "expire_at", "id"),
+        # 列表按 (updated_at, id) 游标分页，复合索引保证每页只做一次索引范围扫描
+        Index("ix_items_team_deleted_updated", "team_id", "deleted", "updated_at", "id"),
+        Index(
+            "ix_items_owner_team_deleted_updated",
+            "owner_openid",
+            "team_id",
+            "deleted",
+            "updated_at",
+            "id",
+        ),
+        # notifier leader 按 updated_at 增量加载其他 worker 写入的提醒变更
+        Index("ix_items_updated_at", "updated_at"),
+    )
+
 
 class User(TimestampMixin, Base):
     __tablename__ = "users"
@@ -75,6 +137,11 @@ class User(TimestampMixin, Base):
     avatar_url = Column(String(1024), nullable=True)
     reminder_days = Column(Integer, nullable=False, default=3)
 
+    __table_args__ = (
+        # notifier leader 按 updated_at 增量加载提醒天数变更
+        Index("ix_users_updated_at", "updated_at"),
+    )
+
 
 class Product(TimestampMixin, Base):
     """商品库表 - 缓存条形码查询结果"""
@@ -140,3 +207,14 @@ class WardrobeOutfit(TimestampMixin, Base):
     season = Column(String(20), nullable=True, comment='季节')
     image_url = Column(String(1024), nullable=True, comment='搭配截图')
 
+
+
+class SchedulerLease(Base):
+    """后台任务租约表 - 多个 worker 进程中选出唯一执行者"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(64), primary_key=True, comment='任务名称')
+    holder = Column(String(255), nullable=False, comment='持有者: 主机名:进程号')
+    acquired_at = Column(DateTime(timezone=True), nullable=False, comment='本次持有开始时间')
+    renewed_at = Column(DateTime(timezone=True), nullable=False, comment='最近续约时间')
+    expires_at = Column(DateTime(timezone=True), nullable=False, comment='租约过期时间')
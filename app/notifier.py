@@ -1,89 +1,407 @@
 import asyncio
+import heapq
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Iterator, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, and_, func, or_, select, text, update
 from sqlalchemy.orm import Session
 
 from .config import settings
 from .database import SessionLocal
+from .leader import notifier_leader
+from .metrics import NOTIFIER_MESSAGES, NOTIFIER_PASS_DURATION
 from .models import Item, User
-from .wechat import send_subscribe_message
+from .wechat import SendReport, SubscribeMessage, send_subscribe_messages_sync
 
 logger = logging.getLogger("app.notifier")
 
+DEFAULT_REMINDER_DAYS = 3
+# 每批读取并提交 notified_at 的行数
+NOTIFY_BATCH_SIZE = 500
+# 全表最大提醒天数的缓存时长（秒）：调大时立即生效，调小最迟在该时长后回落
+MAX_REMINDER_DAYS_TTL_SECONDS = 600
+# 调度堆只装载未来这段时间内的提醒时刻
+SCHEDULE_HORIZON = timedelta(hours=6)
+# 全量重建调度堆的间隔（秒），兜底增量轮询可能遗漏的变更
+SCHEDULE_REBUILD_SECONDS = 3600
+# 路由只能更新本进程的调度堆，leader 按此间隔（秒）从数据库增量加载其他 worker 写入的变更
+SCHEDULE_POLL_SECONDS = 60
+# 增量轮询回看的时长：updated_at 只精确到秒且事务可能晚提交，重叠部分重复调度是幂等的
+SCHEDULE_POLL_OVERLAP = timedelta(seconds=30)
+# 调度/推送异常后的重试间隔（秒）
+RETRY_DELAY_SECONDS = 60
+
+# 提醒任务的 DB 查询与微信 HTTP 调用都是阻塞 I/O，放到专用线程执行，不占用事件循环
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notifier")
+
+# 最大提醒天数缓存：(值, 过期时刻 monotonic)
+_max_reminder_days_cache: tuple[Optional[int], float] = (None, 0.0)
+_max_reminder_days_lock = threading.Lock()
+
+
+def _utcnow() -> datetime:
+    # expire_at 按 UTC 存储为 naive datetime，比较时统一用同口径的当前时间
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _reminder_days_expr():
+    # reminder_days 为 0 时沿用默认值，与旧逻辑 `user.reminder_days or 3` 保持一致
+    return func.coalesce(func.nullif(User.reminder_days, 0), DEFAULT_REMINDER_DAYS)
+
+
+def _max_reminder_days(db: Session) -> int:
+    """全表最大提醒天数（不小于默认值），缓存 MAX_REMINDER_DAYS_TTL_SECONDS 秒，避免每次查询都扫描 users。"""
+    global _max_reminder_days_cache
+    value, expires = _max_reminder_days_cache
+    if value is None or time.monotonic() >= expires:
+        value = max(db.scalar(select(func.max(User.reminder_days))) or 0, DEFAULT_REMINDER_DAYS)
+        with _max_reminder_days_lock:
+            _max_reminder_days_cache = (value, time.monotonic() + MAX_REMINDER_DAYS_TTL_SECONDS)
+    return value
+
+
+def note_reminder_days(reminder_days: Optional[int]) -> None:
+    """用户调大提醒天数时立即抬高缓存的最大值，否则其物品会被索引上界漏掉直到缓存过期。"""
+    global _max_reminder_days_cache
+    if not reminder_days:
+        return
+    with _max_reminder_days_lock:
+        value, expires = _max_reminder_days_cache
+        if value is not None and reminder_days > value:
+            _max_reminder_days_cache = (reminder_days, expires)
 
-def _parse_expire_date(date_str: Optional[str]) -> Optional[datetime]:
-    """严格解析日期：YYYY-MM-DD 或 YYYY-MM-DD HH:MM，失败返回 None。"""
-    if not date_str:
-        return None
-    fmts = ["%Y-%m-%d %H:%M", "%Y-%m-%d"]
-    for fmt in fmts:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            return dt.replace(tzinfo=timezone.utc)
-        except Exception:
-            continue
-    return None
+
+def _pending_before(db: Session, until: datetime) -> tuple:
+    """未删除、未提醒且提醒时刻（expire_at - reminder_days）不晚于 until 的过滤条件。"""
+    max_reminder_days = _max_reminder_days(db)
+    return (
+        Item.deleted.is_(False),
+        Item.notified_at.is_(None),
+        # 先用最大提醒天数给出可走 (deleted, notified_at, expire_at) 索引的上界，再按各用户天数精确过滤
+        Item.expire_at <= until + timedelta(days=max_reminder_days),
+        Item.expire_at <= func.timestampadd(text("DAY"), _reminder_days_expr(), until),
+    )
+
+
+def reminder_deadline(expire_at: datetime, reminder_days: Optional[int]) -> datetime:
+    """物品的提醒时刻：到期时间前 reminder_days 天。"""
+    return expire_at - timedelta(days=reminder_days or DEFAULT_REMINDER_DAYS)
+
+
+def _iter_due_batches(now: datetime) -> Iterator[Sequence[Row]]:
+    """
+    按 (expire_at, id) 游标分页返回到期物品，每批最多 NOTIFY_BATCH_SIZE 行 (id, name, expire_at, openid)。
+
+    排序与 (deleted, notified_at, expire_at, id) 索引顺序一致，每批从上一批的位置继续做索引范围扫描，
+    不会对整个待提醒集合重复排序。
+    每批是一次独立的短查询，读完即归还连接，发送期间不占用游标
+    （流式游标在发送耗时较长时会被 MySQL 的 net_write_timeout 断开）。
+    """
+    after: tuple = ()
+    while True:
+        with SessionLocal() as db:
+            batch = db.execute(
+                select(Item.id, Item.name, Item.expire_at, User.openid)
+                .join(User, User.openid == Item.owner_openid)
+                .where(*_pending_before(db, now), *after)
+                .order_by(Item.expire_at, Item.id)
+                .limit(NOTIFY_BATCH_SIZE)
+            ).all()
+        if not batch:
+            return
+        yield batch
+        if len(batch) < NOTIFY_BATCH_SIZE:
+            return
+        last = batch[-1]
+        after = (
+            or_(
+                Item.expire_at > last.expire_at,
+                and_(Item.expire_at == last.expire_at, Item.id > last.id),
+            ),
+        )
 
 
-def _find_due_items(db: Session) -> list[tuple[User, Item, datetime]]:
+def _mark_notified(item_ids: list[str]) -> None:
+    if not item_ids:
+        return
     now = datetime.now(timezone.utc)
-    rows = (
+    with SessionLocal() as db:
+        # 显式写入 UTC 的 updated_at，与路由保持同一时钟，增量同步令牌才能单调
         db.execute(
-            select(Item, User)
-            .join(User, User.openid == Item.owner_openid)
-            .where(Item.deleted.is_(False), Item.notified_at.is_(None))
+            update(Item)
+            .where(Item.id.in_(item_ids))
+            .values(notified_at=now, updated_at=now)
         )
-        .all()
-    )
-    due = []
-    for item, user in rows:
-        expire_dt = _parse_expire_date(item.expire_date)
-        if not expire_dt:
-            continue
-        reminder_days = user.reminder_days or 3
-        if expire_dt.tzinfo is None:
-            expire_dt = expire_dt.replace(tzinfo=timezone.utc)
-        delta = expire_dt - now
-        if delta <= timedelta(days=reminder_days):
-            due.append((user, item, expire_dt))
-    return due
+        db.commit()
+
+
+def run_notify_pass() -> SendReport:
+    """执行一轮到期提醒，返回本轮发送统计。"""
+    now = _utcnow()
+    total = SendReport()
+    with NOTIFIER_PASS_DURATION.time():
+        for batch in _iter_due_batches(now):
+            messages = [
+                SubscribeMessage(
+                    openid=openid,
+                    template_id=settings.wechat_template_id,
+                    # 订阅消息字段：thing1=物品名, date3=到期时间
+                    data={
+                        "thing1": {"value": name[:20]},
+                        "date3": {"value": expire_at.strftime("%Y-%m-%d %H:%M")},
+                    },
+                    page="pages/index/index",
+                    state="formal",
+                    key=item_id,
+                )
+                for item_id, name, expire_at, openid in batch
+            ]
+            # 执行中失去租约时任务取消不会中断线程池里的本轮推送，发送每批前复核，避免与接管者重复推送
+            if not notifier_leader.holds_lease():
+                logger.warning("notifier: lease lost, stopping pass after %d sent", total.sent)
+                break
+            report = send_subscribe_messages_sync(messages)
+            # 只标记发送成功的物品，失败的留给下一轮重试
+            _mark_notified(report.sent_keys)
+            total.sent += report.sent
+            total.failed += report.failed
+            total.skipped += report.skipped
+            NOTIFIER_MESSAGES.inc("sent", amount=report.sent)
+            NOTIFIER_MESSAGES.inc("failed", amount=report.failed)
+            NOTIFIER_MESSAGES.inc("skipped", amount=report.skipped)
+    return total
+
+
+class ReminderScheduler:
+    """
+    进程内提醒调度器
+
+    以物品的提醒时刻为键维护最小堆，notifier_loop 精确休眠到最近的提醒时刻再执行推送；
+    物品/用户设置变化时由本进程的路由即时更新，其他 worker 的变更由 poll_changes 按 updated_at
+    增量加载。堆只装载 SCHEDULE_HORIZON 内的提醒时刻，更远的在下次重建时加载，
+    内存占用与近期待提醒数量成正比而非全表。
+    """
+
+    def __init__(self, horizon: timedelta = SCHEDULE_HORIZON):
+        self.horizon = horizon
+        self._heap: list[tuple[datetime, str]] = []
+        # item_id -> 当前有效提醒时刻；堆中与之不一致的条目视为已失效（惰性删除）
+        self._deadlines: dict[str, datetime] = {}
+        self._loaded_until: Optional[datetime] = None
+        # 增量轮询的水位：已加载的物品/用户变更中最大的 updated_at（数据库时钟）
+        self._items_polled_at: Optional[datetime] = None
+        self._users_polled_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """绑定到运行 notifier_loop 的事件循环，之后的增量更新才会生效。"""
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def rebuild(self) -> None:
+        """从数据库重新加载 horizon 内（含已过期未提醒）的提醒时刻，在 notifier 线程中调用。"""
+        until = _utcnow() + self.horizon
+        with SessionLocal() as db:
+            # 水位在加载前取得，加载期间的变更留给下一次增量轮询
+            items_polled_at = db.scalar(select(func.max(Item.updated_at)))
+            users_polled_at = db.scalar(select(func.max(User.updated_at)))
+            rows = db.execute(
+                select(Item.id, Item.expire_at, _reminder_days_expr())
+                .join(User, User.openid == Item.owner_openid)
+                .where(*_pending_before(db, until))
+            ).all()
+        deadlines = {
+            item_id: reminder_deadline(expire_at, reminder_days)
+            for item_id, expire_at, reminder_days in rows
+        }
+        heap = [(deadline, item_id) for item_id, deadline in deadlines.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._deadlines = deadlines
+            self._heap = heap
+            self._loaded_until = until
+        self._items_polled_at = items_polled_at
+        self._users_polled_at = users_polled_at
+        logger.info("notifier: scheduled %d reminders until %s", len(deadlines), until)
+
+    def schedule(
+        self, item_id: str, expire_at: Optional[datetime], reminder_days: Optional[int]
+    ) -> None:
+        """新增或更新一个物品的提醒时刻，可在任意线程调用。"""
+        if self._loop is None:
+            return
+        if expire_at is None:
+            self.discard(item_id)
+            return
+        deadline = reminder_deadline(expire_at, reminder_days)
+        with self._lock:
+            if self._loaded_until is None or deadline > self._loaded_until:
+                # 超出当前窗口，留给下次重建加载
+                self._deadlines.pop(item_id, None)
+                return
+            self._deadlines[item_id] = deadline
+            heapq.heappush(self._heap, (deadline, item_id))
+            earliest = self._heap[0] == (deadline, item_id)
+        if earliest:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def discard(self, item_id: str) -> None:
+        """物品删除或已提醒时移除其提醒时刻。"""
+        with self._lock:
+            self._deadlines.pop(item_id, None)
+
+    def reschedule_owner(self, db: Session, openid: str, reminder_days: Optional[int]) -> None:
+        """用户修改提醒天数后，重新计算其名下待提醒物品的提醒时刻。"""
+        note_reminder_days(reminder_days)
+        if self._loop is None:
+            return
+        rows = db.execute(
+            select(Item.id, Item.expire_at).where(
+                Item.owner_openid == openid,
+                Item.deleted.is_(False),
+                Item.notified_at.is_(None),
+                Item.expire_at.is_not(None),
+            )
+        ).all()
+        for item_id, expire_at in rows:
+            self.schedule(item_id, expire_at, reminder_days)
+
+    def poll_changes(self) -> int:
+        """
+        加载上次重建/轮询之后变更的物品与用户设置，在 notifier 线程中调用，返回处理的行数。
+
+        按 updated_at 索引范围查询，只读取回看窗口内变更的行；
+        超出回看窗口才提交的事务由下一次全量重建兜底。
+        """
+        if self._loop is None or self._loaded_until is None:
+            return 0
+        # 水位为空说明重建时表中还没有数据，此时全部读取
+        items_since = (
+            ()
+            if self._items_polled_at is None
+            else (Item.updated_at >= self._items_polled_at - SCHEDULE_POLL_OVERLAP,)
+        )
+        users_since = (
+            ()
+            if self._users_polled_at is None
+            else (User.updated_at >= self._users_polled_at - SCHEDULE_POLL_OVERLAP,)
+        )
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(
+                    Item.id,
+                    Item.expire_at,
+                    Item.deleted,
+                    Item.notified_at,
+                    Item.updated_at,
+                    User.reminder_days,
+                )
+                .join(User, User.openid == Item.owner_openid)
+                .where(*items_since)
+            ).all()
+            for item_id, expire_at, deleted, notified_at, updated_at, reminder_days in rows:
+                if deleted or notified_at or not expire_at:
+                    self.discard(item_id)
+                else:
+                    self.schedule(item_id, expire_at, reminder_days)
+                if self._items_polled_at is None or updated_at > self._items_polled_at:
+                    self._items_polled_at = updated_at
+
+            users = db.execute(
+                select(User.openid, User.reminder_days, User.updated_at).where(*users_since)
+            ).all()
+            for openid, reminder_days, updated_at in users:
+                self.reschedule_owner(db, openid, reminder_days)
+                if self._users_polled_at is None or updated_at > self._users_polled_at:
+                    self._users_polled_at = updated_at
+        return len(rows) + len(users)
+
+    def pop_due(self, now: datetime) -> int:
+        """弹出所有已到提醒时刻的有效条目，返回条目数。"""
+        count = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, item_id = heapq.heappop(self._heap)
+                if self._deadlines.get(item_id) == deadline:
+                    del self._deadlines[item_id]
+                    count += 1
+        return count
+
+    def _next_deadline(self) -> Optional[datetime]:
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    async def sleep(self, max_seconds: float) -> None:
+        """休眠到最近的提醒时刻（最多 max_seconds），有更早的提醒加入时提前唤醒。"""
+        # clear 与计算之间没有 await，其他线程的唤醒不会丢失
+        self._wakeup.clear()
+        delay = max_seconds
+        deadline = self._next_deadline()
+        if deadline is not None:
+            delay = min(delay, (deadline - _utcnow()).total_seconds())
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+reminder_scheduler = ReminderScheduler()
 
 
 async def notifier_loop():
-    """每小时检查一次即将到期/已到期物品并推送订阅消息。"""
+    """按提醒时刻调度：休眠到最近的提醒时刻，检查即将到期/已到期物品并推送订阅消息。"""
     if not settings.wechat_template_id:
         logger.warning("WECHAT_TEMPLATE_ID 未配置，跳过自动推送")
         return
 
+    loop = asyncio.get_running_loop()
+    reminder_scheduler.attach(loop)
+    next_rebuild = loop.time()
+    next_poll = next_rebuild + SCHEDULE_POLL_SECONDS
+    retry_delay = RETRY_DELAY_SECONDS
     while True:
         try:
-            with SessionLocal() as db:
-                due_items = _find_due_items(db)
-                if not due_items:
-                    logger.info("notifier: no due items")
-                for user, item, expire_dt in due_items:
-                    # 订阅消息字段：thing1=物品名, date3=到期时间
-                    data = {
-                        "thing1": {"value": item.name[:20]},
-                        "date3": {"value": expire_dt.strftime("%Y-%m-%d %H:%M")},
-                    }
-                    send_subscribe_message(
-                        openid=user.openid,
-                        template_id=settings.wechat_template_id,
-                        data=data,
-                        page="pages/index/index",
-                        state="formal",
-                    )
-                    item.notified_at = datetime.now(timezone.utc)
-                if due_items:
-                    db.commit()
-                if due_items:
-                    logger.info("notifier: sent %d messages", len(due_items))
+            if loop.time() >= next_rebuild:
+                await loop.run_in_executor(_executor, reminder_scheduler.rebuild)
+                next_rebuild = loop.time() + SCHEDULE_REBUILD_SECONDS
+                next_poll = loop.time() + SCHEDULE_POLL_SECONDS
+            elif loop.time() >= next_poll:
+                next_poll = loop.time() + SCHEDULE_POLL_SECONDS
+                await loop.run_in_executor(_executor, reminder_scheduler.poll_changes)
+            if reminder_scheduler.pop_due(_utcnow()):
+                report = await loop.run_in_executor(_executor, run_notify_pass)
+                logger.info(
+                    "notifier: sent %d, failed %d, skipped %d",
+                    report.sent,
+                    report.failed,
+                    report.skipped,
+                )
+                if report.failed:
+                    # 发送失败的物品未标记 notified_at，但已从堆中弹出：稍后重建调度堆重新加载并重试；
+                    # 连续失败时逐次加倍间隔，避免永久性失败（如用户拒收）每分钟重发一次
+                    next_rebuild = min(next_rebuild, loop.time() + retry_delay)
+                    retry_delay = min(retry_delay * 2, SCHEDULE_REBUILD_SECONDS)
+                else:
+                    retry_delay = RETRY_DELAY_SECONDS
         except Exception as exc:
             logger.exception("notifier failed: %s", exc)
+            # 出错后稍后重建调度堆，找回本轮已弹出但未推送成功的提醒；
+            # 重建本身失败时 next_rebuild 已过期，直接赋值才不会立即重试
+            next_rebuild = loop.time() + RETRY_DELAY_SECONDS
+
+        await reminder_scheduler.sleep(min(next_rebuild, next_poll) - loop.time())
 
-        await asyncio.sleep(3600)  # 1h
 
+def shutdown_notifier() -> None:
+    """关闭提醒线程池，未开始的任务直接取消。"""
+    _executor.shutdown(wait=False, cancel_futures=True)
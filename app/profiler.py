@@ -0,0 +1,188 @@
+"""
+单请求采样分析
+- 请求头 X-Profile 等于 PROFILE_SECRET 时，对这一个请求采样调用栈；
+  不接受查询参数，避免密钥随完整 URL 写进请求日志和代理访问日志
+- 后台线程每 SAMPLE_INTERVAL_SECONDS 抓取一次所有线程的调用栈（sys._current_frames），
+  协程、线程池中的同步路由与 run_sync 都能覆盖
+- 结果为 collapsed stack 格式（每行 "线程;外层;...;内层 次数"），
+  可直接用 speedscope、flamegraph.pl、inferno 生成火焰图
+- 文件写入 PROFILE_DIR，总大小超过 PROFILE_MAX_MB 时删除最旧的文件
+- 未配置 PROFILE_SECRET 时不安装中间件；配置后普通请求只多一次请求头查找
+
+采样的是整个进程：同一时间段内其他并发请求的调用栈也会出现在结果中，按线程名与路由函数区分。
+挂起在 await 上的协程不在调用栈中，等待 I/O 的时间体现为事件循环线程停在 select 上。
+同一时间只分析一个请求，其余带开关的请求照常处理、不采样。
+"""
+import asyncio
+import hmac
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .logger import logger
+
+PROFILE_HEADER = b"x-profile"
+SAMPLE_INTERVAL_SECONDS = 0.001
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9_.-]+")
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+
+
+class StackSampler(threading.Thread):
+    """按固定间隔抓取所有线程调用栈并累计为 collapsed stack。"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_SECONDS):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+        # code 对象 -> 帧标签，同一函数只格式化一次
+        self._labels: dict = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            marker = filename.rfind("site-packages")
+            if marker >= 0:
+                filename = filename[marker + len("site-packages") + 1:]
+            elif filename.startswith(_STDLIB_DIR):
+                filename = filename[len(_STDLIB_DIR) + 1:]
+            else:
+                filename = os.path.relpath(filename) if os.path.isabs(filename) else filename
+            # 分号是 collapsed stack 的分隔符
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def run(self) -> None:
+        own_ident = threading.get_ident()
+        thread_names: dict[int, str] = {}
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            if frames.keys() - thread_names.keys():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)).replace(";", ":"))
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _enforce_retention(directory: Path, max_bytes: int) -> None:
+    """目录总大小超限时从最旧的文件开始删除。"""
+    files = []
+    for path in directory.glob("*.folded"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except FileNotFoundError:
+            total -= size
+        except OSError as exc:
+            logger.warning("删除分析文件失败 %s: %s", path, exc)
+
+
+def _write_profile(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    _enforce_retention(path.parent, int(settings.profile_max_mb * 1024 * 1024))
+
+
+def _profile_requested(scope: Scope) -> bool:
+    token = None
+    for key, value in scope["headers"]:
+        if key == PROFILE_HEADER:
+            token = value.decode("latin-1")
+            break
+    # 按字节比较：compare_digest 遇到非 ASCII 字符串会抛 TypeError
+    return bool(token) and hmac.compare_digest(
+        token.encode("utf-8"), settings.profile_secret.encode("utf-8")
+    )
+
+
+def _profile_filename(scope: Scope) -> str:
+    path = _UNSAFE_FILENAME_CHARS.sub("_", scope["path"].strip("/")) or "root"
+    request_id = scope.get("state", {}).get("request_id", "")
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    parts = [stamp, scope["method"], path[:80], request_id]
+    return "_".join(part for part in parts if part) + ".folded"
+
+
+class ProfilingMiddleware:
+    """对携带正确密钥的单个请求做调用栈采样，结果文件名通过 X-Profile-File 响应头返回。"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._busy.acquire(blocking=False):
+            logger.warning("已有请求正在分析，跳过 %s %s", scope["method"], scope["path"])
+            await self.app(scope, receive, send)
+            return
+
+        filename = _profile_filename(scope)
+
+        async def send_with_header(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-File", filename)
+            await send(message)
+
+        sampler = StackSampler()
+        start_time = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - start_time
+            self._busy.release()
+            path = Path(settings.profile_dir) / filename
+            try:
+                await asyncio.to_thread(_write_profile, path, sampler.collapsed())
+                logger.info(
+                    "请求分析完成 | %s %s | 耗时: %.3fs | 采样: %d | 文件: %s",
+                    scope["method"],
+                    scope["path"],
+                    elapsed,
+                    sampler.samples,
+                    path,
+                )
+            except OSError as exc:
+                logger.error("写入分析文件失败 %s: %s", path, exc)
+
@@ -4,8 +4,14 @@
 from typing import Any, Optional, TypeVar, Generic
 from pydantic import BaseModel
 from fastapi import status
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时退回标准库 json
+    orjson = None
+
 
 # 标准响应码
 class ResponseCode:
@@ -45,6 +51,20 @@ class ResponseMessage:
     NETWORK_ERROR = "网络请求失败"
 
 
+class FastJSONResponse(JSONResponse):
+    """
+    默认 JSON 响应类
+    - 安装了 orjson 时用其序列化，输出格式与 JSONResponse 一致（紧凑分隔符、中文不转义）
+    - orjson 不支持的类型（如 Decimal）交给 jsonable_encoder，与 FastAPI 的处理方式相同
+    - 未安装 orjson 时先经 jsonable_encoder 再交给 JSONResponse
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(jsonable_encoder(content))
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+
+
 T = TypeVar('T')
 
 
@@ -70,7 +90,7 @@ class ResponseUtil:
     @staticmethod
     def success(data: Any = None, message: str = ResponseMessage.SUCCESS, code: int = ResponseCode.SUCCESS) -> JSONResponse:
         """成功响应"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "code": code,
@@ -82,7 +102,7 @@ class ResponseUtil:
     @staticmethod
     def created(data: Any = None, message: str = ResponseMessage.CREATED) -> JSONResponse:
         """创建成功响应"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_201_CREATED,
             content={
                 "code": ResponseCode.SUCCESS,
@@ -99,7 +119,7 @@ class ResponseUtil:
         http_status: int = status.HTTP_500_INTERNAL_SERVER_ERROR
     ) -> JSONResponse:
         """错误响应"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=http_status,
             content={
                 "code": code,
@@ -111,7 +131,7 @@ class ResponseUtil:
     @staticmethod
     def bad_request(message: str = ResponseMessage.BAD_REQUEST, data: Any = None) -> JSONResponse:
         """请求参数错误"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
                 "code": ResponseCode.BAD_REQUEST,
@@ -123,7 +143,7 @@ class ResponseUtil:
     @staticmethod
     def unauthorized(message: str = ResponseMessage.UNAUTHORIZED) -> JSONResponse:
         """未授权"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
             content={
                 "code": ResponseCode.UNAUTHORIZED,
@@ -135,7 +155,7 @@ class ResponseUtil:
     @staticmethod
     def forbidden(message: str = ResponseMessage.FORBIDDEN) -> JSONResponse:
         """禁止访问"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_403_FORBIDDEN,
             content={
                 "code": ResponseCode.FORBIDDEN,
@@ -147,7 +167,7 @@ class ResponseUtil:
     @staticmethod
     def not_found(message: str = ResponseMessage.NOT_FOUND) -> JSONResponse:
         """资源不存在"""
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
                 "code": ResponseCode.NOT_FOUND,
@@ -0,0 +1,57 @@
+"""内部管理接口（需 X-Admin-Token）"""
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from ..auth import require_admin
+from ..cache import membership_cache
+from ..database import async_engine, engine, pool_status, sql_stats
+from ..leader import HOLDER_ID, notifier_leader
+from ..metrics import registry
+from ..schemas import CacheStatsOut, DatabasePoolsOut, NotifierLeaseOut, SqlStatsOut
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+# Prometheus 约定的抓取路径为 /metrics，不放在 /admin 前缀下
+metrics_router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin)])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/notifier", response_model=NotifierLeaseOut)
+def get_notifier_lease():
+    """查看当前持有 notifier 租约的进程及最近续约时间"""
+    lease = notifier_leader.get_lease()
+    return NotifierLeaseOut(
+        holder=lease.holder if lease else None,
+        acquired_at=lease.acquired_at if lease else None,
+        renewed_at=lease.renewed_at if lease else None,
+        expires_at=lease.expires_at if lease else None,
+        current_process=HOLDER_ID,
+        is_leader=notifier_leader.is_leader,
+    )
+
+
+@router.get("/cache", response_model=CacheStatsOut)
+def get_membership_cache_stats():
+    """查看当前进程团队成员身份缓存的命中率与容量"""
+    return CacheStatsOut(**membership_cache.stats())
+
+
+@router.get("/db-pool", response_model=DatabasePoolsOut)
+def get_db_pool_stats():
+    """查看当前进程同步/异步连接池的连接占用与取连接等待统计"""
+    return DatabasePoolsOut(
+        sync=pool_status(engine),
+        async_=pool_status(async_engine.sync_engine),
+    )
+
+
+@router.get("/sql-stats", response_model=SqlStatsOut)
+def get_sql_stats(top: int = Query(default=50, ge=1, le=500)):
+    """按语句形状查看当前进程的 SQL 耗时分布，按总耗时倒序"""
+    return SqlStatsOut(statements=sql_stats.snapshot(top))
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus 文本格式的当前进程指标（各 worker 分别抓取）"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 
 from ..auth import fake_wechat_code2session, get_current_openid
-from ..database import get_db
+from ..database import get_async_db
 from ..models import User
+from ..notifier import reminder_scheduler
 from ..schemas import (
     LoginRequest,
     LoginResponse,
@@ -27,12 +28,12 @@ def login(payload: LoginRequest):
 
 @router.get("/me", response_model=UserProfile)
 @router.get("/settings/me", response_model=UserProfile)
-def get_me(
-    db: Session = Depends(get_db),
+async def get_me(
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     # 若用户不存在则以默认值创建，避免客户端拿不到用户资料
-    user = db.get(User, openid)
+    user = await db.get(User, openid)
     if not user:
         user = User(
             openid=openid,
@@ -42,8 +43,8 @@ def get_me(
             reminder_days=3,
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     return user
 
 
@@ -51,12 +52,12 @@ def get_me(
 @router.patch("/settings/me", response_model=UserProfile)
 @router.put("/me", response_model=UserProfile)
 @router.put("/settings/me", response_model=UserProfile)
-def update_me(
+async def update_me(
     payload: UpdateUserProfile,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    user = db.get(User, openid)
+    user = await db.get(User, openid)
     if not user:
         user = User(
             openid=openid,
@@ -67,6 +68,7 @@ def update_me(
         )
         db.add(user)
 
+    previous_reminder_days = user.reminder_days
     update_data = payload.model_dump(exclude_none=True, by_alias=True)
     for field, value in update_data.items():
         if field == "phoneNumber":
@@ -81,7 +83,9 @@ def update_me(
     # 无论字段是否变更，强制更新时间戳
     user.updated_at = func.now()
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    if user.reminder_days != previous_reminder_days:
+        await db.run_sync(reminder_scheduler.reschedule_owner, openid, user.reminder_days)
     return user
 
@@ -10,6 +10,7 @@ from ..auth import get_current_openid
 from ..logger import logger
 from ..response import success_response, error_response, ResponseCode
 from ..database import get_db
+from ..metrics import BARCODE_LOOKUPS
 from ..models import Product
 
 router = APIRouter(prefix="/barcode", tags=["barcode"])
@@ -186,12 +187,14 @@ def query_barcode_api(db: Session, barcode: str) -> dict:
     result = query_database(db, barcode)
     if result['found']:
         logger.info(f"数据库找到商品: {barcode}")
+        BARCODE_LOOKUPS.inc("database")
         return result
     
     # 2. 查本地静态数据
     result = query_local_database(barcode)
     if result['found']:
         logger.info(f"本地静态数据找到商品: {barcode}")
+        BARCODE_LOOKUPS.inc("local")
         # 保存到数据库
         save_product_to_db(db, barcode, result)
         return result
@@ -200,6 +203,7 @@ def query_barcode_api(db: Session, barcode: str) -> dict:
     result = query_openfoodfacts(barcode)
     if result['found']:
         logger.info(f"Open Food Facts找到商品: {barcode}")
+        BARCODE_LOOKUPS.inc("openfoodfacts")
         # 保存到数据库
         save_product_to_db(db, barcode, result)
         return result
@@ -208,12 +212,14 @@ def query_barcode_api(db: Session, barcode: str) -> dict:
     result = query_upcitemdb(barcode)
     if result['found']:
         logger.info(f"UPCitemdb找到商品: {barcode}")
+        BARCODE_LOOKUPS.inc("upcitemdb")
         # 保存到数据库
         save_product_to_db(db, barcode, result)
         return result
     
     # 都没找到
     logger.warning(f"所有数据源都未找到商品: {barcode}")
+    BARCODE_LOOKUPS.inc("miss")
     return {'found': False, 'barcode': barcode}
 
 
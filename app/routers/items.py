@@ -1,55 +1,113 @@
-from datetime import datetime, timezone
+import base64
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..auth import get_current_openid
-from ..database import get_db
-from ..models import Item, Team
+from ..cache import membership_cache
+from ..database import get_async_db, get_db
+from ..etag import conditional_response, scope_version
+from ..models import Item, Team, TeamMember, User, parse_expire_date
+from ..notifier import reminder_scheduler
 from ..schemas import (
+    ItemBatchOperation,
+    ItemBatchRequest,
+    ItemBatchResponse,
+    ItemBatchResult,
+    ItemChangesResponse,
     ItemCreate,
     ItemOut,
     ItemUpdate,
     ItemsResponse,
+    ItemTombstone,
     MessageResponse,
 )
-from ..wechat import send_subscribe_message
+from ..serializers import ListProjection, list_response
+from ..wechat import SendReport, SubscribeMessage, send_subscribe_messages_sync
 from ..config import settings
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+ITEM_OUT_PROJECTION = ListProjection(ItemOut, Item)
+
+# 新建/更新时允许写入的字段（team_id 只在新建时生效）
+ITEM_WRITABLE_FIELDS = (
+    "name",
+    "category",
+    "expire_date",
+    "note",
+    "barcode",
+    "product_image",
+    "quantity",
+)
+# 其中不允许为 NULL 的字段：批量写入前逐条校验，避免一条非法数据让整批提交失败
+ITEM_REQUIRED_FIELDS = tuple(
+    field for field in ITEM_WRITABLE_FIELDS if not Item.__table__.c[field].nullable
+)
 
-def _parse_expire_date(date_str: Optional[str]) -> Optional[datetime]:
-    """严格解析日期：YYYY-MM-DD 或 YYYY-MM-DD HH:MM。"""
-    if not date_str:
-        return None
-    fmts = ["%Y-%m-%d %H:%M", "%Y-%m-%d"]
-    for fmt in fmts:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            return dt.replace(tzinfo=timezone.utc)
-        except Exception:
-            continue
+
+def _null_required_field(values: dict) -> Optional[str]:
+    """返回被显式置为 null 的必填字段名，没有则返回 None。"""
+    for field in ITEM_REQUIRED_FIELDS:
+        if field in values and values[field] is None:
+            return field
     return None
 
 
+# 增量同步只返回 updated_at 早于「当前时间 - 该秒数」的变更：
+# updated_at 只精确到秒，且时间戳在事务开始时取得、提交可能稍晚，
+# 若同步令牌越过仍可能出现新写入的时刻，同一秒内 id 更小的写入或晚提交的事务会被永久跳过
+CHANGES_SETTLE_SECONDS = 5
+
+
+def _changes_settled_before() -> datetime:
+    """增量同步的上界（UTC naive，取整到秒）：此前的写入均已提交，令牌不会越过它。"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    return now - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+
+
+def _encode_cursor(updated_at: datetime, item_id: str) -> str:
+    """将分页/同步位置 (updated_at, id) 编码为不透明游标。"""
+    raw = f"{updated_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        updated_at_str, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(updated_at_str), item_id
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
 def normalize_team_id(team_id: Optional[str]) -> Optional[str]:
     if team_id is None or team_id == "":
         return None
     return team_id
 
 
-def ensure_team_member(db: Session, team_id: str, openid: str) -> Team:
-    team = db.get(Team, team_id)
-    if not team:
+# 以下校验/调度函数基于同步 Session，async 路由通过 AsyncSession.run_sync 复用
+def ensure_team_member(db: Session, team_id: str, openid: str) -> None:
+    if membership_cache.get((team_id, openid)):
+        return
+    # 成员身份按 (team_id, openid) 主键查询，只有失败时才区分团队不存在与无权限
+    if db.get(TeamMember, (team_id, openid)) is not None:
+        # 只缓存「是成员」：失效通知到不了其他 worker，缓存否定结果会让刚加入团队的用户
+        # 在其他 worker 上被拒绝最多一个 TTL；退出团队的延迟生效已由 TTL 兜底
+        membership_cache.set((team_id, openid), True)
+        return
+    if not db.get(Team, team_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Team not found")
-    if openid not in team.member_openids:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this team"
-        )
-    return team
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN, detail="No permission for this team"
+    )
 
 
 def ensure_item_permission(db: Session, item: Item, openid: str) -> None:
@@ -62,44 +120,176 @@ def ensure_item_permission(db: Session, item: Item, openid: str) -> None:
             )
 
 
+def _scope_filter(team_id: Optional[str], openid: str) -> tuple:
+    """团队物品或个人（无团队）物品的范围条件。"""
+    if team_id:
+        return (Item.team_id == team_id,)
+    return (Item.owner_openid == openid, Item.team_id.is_(None))
+
+
+def _allowed_team_ids(db: Session, team_ids: set[str], openid: str) -> set[str]:
+    """一次查询校验多个团队的成员身份，返回当前用户有权限的团队 id。"""
+    if not team_ids:
+        return set()
+    return set(
+        db.scalars(
+            select(TeamMember.team_id).where(
+                TeamMember.openid == openid, TeamMember.team_id.in_(team_ids)
+            )
+        )
+    )
+
+
+def _schedule_reminder(db: Session, item: Item) -> None:
+    """物品变更后同步进程内提醒调度。"""
+    if item.deleted or item.notified_at or not item.expire_at:
+        reminder_scheduler.discard(item.id)
+        return
+    owner = db.get(User, item.owner_openid)
+    reminder_scheduler.schedule(item.id, item.expire_at, owner.reminder_days if owner else None)
+
+
 @router.get("", response_model=ItemsResponse)
-def list_items(
+async def list_items(
+    request: Request,
+    response: Response,
     team_id: Optional[str] = Query(default=None, alias="teamId"),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+    openid: str = Depends(get_current_openid),
+):
+    """
+    按 (updated_at, id) 倒序列出物品。
+
+    传入 limit 时按页返回，nextCursor 非空表示还有下一页，下次请求原样带回 cursor；
+    不传 limit 时保持旧行为，一次返回全部。支持 If-None-Match 条件请求。
+    """
+    team_id = normalize_team_id(team_id)
+    if team_id:
+        await db.run_sync(ensure_team_member, team_id, openid)
+    criteria = (*_scope_filter(team_id, openid), Item.deleted.is_(False))
+
+    not_modified = conditional_response(
+        request,
+        response,
+        "items",
+        team_id,
+        openid,
+        limit,
+        cursor,
+        *await scope_version(db, Item, *criteria),
+    )
+    if not_modified:
+        return not_modified
+
+    # 只取 ItemOut 需要的列并直接按别名输出，跳过 ORM 对象构造与 response_model 逐行校验
+    stmt = ITEM_OUT_PROJECTION.select().where(*criteria)
+    stmt = stmt.order_by(Item.updated_at.desc(), Item.id.desc())
+
+    if cursor:
+        cursor_updated_at, cursor_id = _decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                Item.updated_at < cursor_updated_at,
+                and_(Item.updated_at == cursor_updated_at, Item.id < cursor_id),
+            )
+        )
+
+    if limit is None:
+        items = await ITEM_OUT_PROJECTION.rows_async(db, stmt)
+        return list_response(response, {"items": items, "nextCursor": None})
+
+    # 多取一条用于判断是否还有下一页
+    items = await ITEM_OUT_PROJECTION.rows_async(db, stmt.limit(limit + 1))
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = _encode_cursor(items[-1]["updateDate"], items[-1]["id"])
+    return list_response(response, {"items": items, "nextCursor": next_cursor})
+
+
+@router.get("/changes", response_model=ItemChangesResponse)
+def list_item_changes(
+    team_id: Optional[str] = Query(default=None, alias="teamId"),
+    since: Optional[str] = Query(default=None),
+    limit: int = Query(default=500, ge=1, le=1000),
     db: Session = Depends(get_db),
     openid: str = Depends(get_current_openid),
 ):
+    """
+    增量同步：返回 since 令牌之后新建/更新的物品，以及软删除物品的墓碑。
+
+    首次同步不传 since，只返回未删除物品；之后每次带上响应中的 syncToken。
+    hasMore 为 true 时立即用新的 syncToken 继续拉取。
+    最近 CHANGES_SETTLE_SECONDS 秒内的变更留到下一次同步返回，保证令牌之前的变更不会遗漏。
+    """
     team_id = normalize_team_id(team_id)
     if team_id:
         ensure_team_member(db, team_id, openid)
-        stmt = (
-            select(Item)
-            .where(Item.team_id == team_id, Item.deleted.is_(False))
-            .order_by(Item.updated_at.desc())
-        )
-    else:
-        stmt = (
-            select(Item)
-            .where(
-                Item.owner_openid == openid,
-                Item.team_id.is_(None),
-                Item.deleted.is_(False),
-            )
-            .order_by(Item.updated_at.desc())
+
+    scope = _scope_filter(team_id, openid)
+    order = (Item.updated_at.asc(), Item.id.asc())
+    after = (Item.updated_at < _changes_settled_before(),)
+    if since:
+        since_updated_at, since_id = _decode_cursor(since)
+        after += (
+            or_(
+                Item.updated_at > since_updated_at,
+                and_(Item.updated_at == since_updated_at, Item.id > since_id),
+            ),
         )
-    items = db.scalars(stmt).all()
-    return ItemsResponse(items=items)
+
+    # 未删除与已删除分两次查询，各自走 (范围, deleted, updated_at, id) 索引，再按同一顺序归并
+    items = db.scalars(
+        select(Item)
+        .where(*scope, Item.deleted.is_(False), *after)
+        .order_by(*order)
+        .limit(limit + 1)
+    ).all()
+    tombstones = []
+    if since:
+        tombstones = db.execute(
+            select(Item.id, Item.updated_at, Item.deleted_at)
+            .where(*scope, Item.deleted.is_(True), *after)
+            .order_by(*order)
+            .limit(limit + 1)
+        ).all()
+
+    # (updated_at, id, 是否已删除, 行)
+    merged = sorted(
+        [(item.updated_at, item.id, False, item) for item in items]
+        + [(row.updated_at, row.id, True, row) for row in tombstones],
+        key=lambda entry: (entry[0], entry[1]),
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    sync_token = since
+    if merged:
+        sync_token = _encode_cursor(merged[-1][0], merged[-1][1])
+    return ItemChangesResponse(
+        items=[row for _, _, deleted, row in merged if not deleted],
+        deleted=[
+            ItemTombstone(id=row.id, deleted_at=row.deleted_at)
+            for _, _, deleted, row in merged
+            if deleted
+        ],
+        sync_token=sync_token,
+        has_more=has_more,
+    )
 
 
 @router.get("/{item_id}", response_model=ItemOut)
-def get_item(
+async def get_item(
     item_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    item = db.get(Item, item_id)
+    item = await db.get(Item, item_id)
     if not item or item.deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
-    ensure_item_permission(db, item, openid)
+    await db.run_sync(ensure_item_permission, item, openid)
     return item
 
 
@@ -126,43 +316,258 @@ def notify_items(
     if not items:
         return MessageResponse(message="no items")
 
+    messages: list[SubscribeMessage] = []
+    skipped = 0
+    deliver = send and bool(settings.wechat_template_id)
+    for item in items:
+        if deliver:
+            if not item.expire_at:
+                skipped += 1
+                continue
+            messages.append(
+                SubscribeMessage(
+                    openid=openid,
+                    template_id=settings.wechat_template_id,
+                    data={
+                        "thing1": {"value": item.name[:20]},
+                        "date3": {"value": item.expire_at.strftime("%Y-%m-%d %H:%M")},
+                    },
+                    page="pages/index/index",
+                    state="formal",
+                    key=item.id,
+                )
+            )
+
+    report = send_subscribe_messages_sync(messages) if messages else SendReport()
+
+    # 只标记真正发出的物品，发送失败或缺少到期时间的保持未通知，之后仍可重试；
+    # 不发送（send=false 或未配置模板）时按调用方意图全部标记
+    sent_ids = set(report.sent_keys)
     now = datetime.now(timezone.utc)
-    sent = 0
+    notified = 0
     for item in items:
-        item.notified_at = now
-        if send and settings.wechat_template_id:
-            expire_dt = _parse_expire_date(item.expire_date)
-            if not expire_dt:
+        if not deliver or item.id in sent_ids:
+            item.notified_at = now
+            item.updated_at = now
+            notified += 1
+    db.commit()
+    return MessageResponse(
+        message=(
+            f"notified {notified}, sent {report.sent}, "
+            f"failed {report.failed}, skipped {report.skipped + skipped}"
+        )
+    )
+
+
+@router.post("/batch", response_model=ItemBatchResponse)
+def batch_items(
+    payload: ItemBatchRequest,
+    db: Session = Depends(get_db),
+    openid: str = Depends(get_current_openid),
+):
+    """
+    批量新建/更新/删除物品，所有成功的条目在同一事务中批量写入。
+
+    每个团队只校验一次成员身份；单条失败（不存在、无权限、参数错误）只体现在该条结果中，
+    不影响其他条目。
+    """
+    operations = payload.operations
+    now = datetime.now(timezone.utc)
+    results: list[Optional[ItemBatchResult]] = [None] * len(operations)
+
+    def _fail(index: int, op: ItemBatchOperation, code: int, detail: str) -> None:
+        results[index] = ItemBatchResult(
+            index=index, op=op.op, id=op.id, status=code, detail=detail
+        )
+
+    # 一次加载所有 update/delete 目标的权限相关字段
+    target_ids = {op.id for op in operations if op.op != "create" and op.id}
+    targets = (
+        {
+            row.id: row
+            for row in db.execute(
+                select(Item.id, Item.owner_openid, Item.team_id, Item.deleted).where(
+                    Item.id.in_(target_ids)
+                )
+            )
+        }
+        if target_ids
+        else {}
+    )
+
+    # 新建时与 create_item 一致：同名已删除记录直接恢复
+    create_names = {
+        op.data.name for op in operations if op.op == "create" and op.data and op.data.name
+    }
+    restorable: dict[tuple[Optional[str], str], str] = {}
+    if create_names:
+        for row in db.execute(
+            select(Item.id, Item.team_id, Item.name).where(
+                Item.owner_openid == openid,
+                Item.name.in_(create_names),
+                Item.deleted.is_(True),
+            )
+        ):
+            restorable.setdefault((row.team_id, row.name), row.id)
+
+    # 涉及的团队统一校验一次
+    team_ids = {
+        normalize_team_id(op.data.team_id)
+        for op in operations
+        if op.op == "create" and op.data
+    } | {row.team_id for row in targets.values()}
+    team_ids.discard(None)
+    allowed_teams = _allowed_team_ids(db, team_ids, openid)
+
+    inserts: list[dict] = []
+    updates: list[dict] = []
+    delete_ids: list[str] = []
+    written: dict[str, list[int]] = {}
+    seen_ids: set[str] = set()
+
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            data = op.data
+            if data is None or not data.name:
+                _fail(index, op, status.HTTP_400_BAD_REQUEST, "name is required")
+                continue
+            team_id = normalize_team_id(data.team_id)
+            if team_id and team_id not in allowed_teams:
+                _fail(index, op, status.HTTP_403_FORBIDDEN, "No permission for this team")
+                continue
+
+            restored_id = restorable.get((team_id, data.name))
+            if restored_id and restored_id in seen_ids:
+                _fail(index, op, status.HTTP_400_BAD_REQUEST, "Duplicate item in batch")
+                continue
+            if restored_id:
+                values = {
+                    field: value
+                    for field, value in data.model_dump(exclude_unset=True).items()
+                    if field in ITEM_WRITABLE_FIELDS
+                }
+                null_field = _null_required_field(values)
+                if null_field:
+                    _fail(index, op, status.HTTP_400_BAD_REQUEST, f"{null_field} cannot be null")
+                    continue
+                del restorable[(team_id, data.name)]
+                values.update(
+                    id=restored_id,
+                    deleted=False,
+                    deleted_at=None,
+                    deleted_by=None,
+                    updated_at=now,
+                )
+                updates.append(values)
+                item_id = restored_id
+            else:
+                values = {field: getattr(data, field) for field in ITEM_WRITABLE_FIELDS}
+                if values["quantity"] is None:
+                    values["quantity"] = 1
+                item_id = str(uuid4())
+                values.update(
+                    id=item_id,
+                    owner_openid=openid,
+                    team_id=team_id,
+                    deleted=False,
+                    created_at=now,
+                    updated_at=now,
+                )
+                inserts.append(values)
+            # 批量写入不经过模型的 validates，需显式同步 expire_at
+            if "expire_date" in values:
+                values["expire_at"] = parse_expire_date(values["expire_date"])
+            # 恢复/新建的记录在本批次中不能再被其他条目修改或删除
+            seen_ids.add(item_id)
+            written.setdefault(item_id, []).append(index)
+            continue
+
+        if not op.id:
+            _fail(index, op, status.HTTP_400_BAD_REQUEST, "id is required")
+            continue
+        if op.id in seen_ids:
+            _fail(index, op, status.HTTP_400_BAD_REQUEST, "Duplicate item in batch")
+            continue
+        row = targets.get(op.id)
+        if not row or (op.op == "update" and row.deleted):
+            _fail(index, op, status.HTTP_404_NOT_FOUND, "Item not found")
+            continue
+        if row.team_id:
+            if row.team_id not in allowed_teams:
+                _fail(index, op, status.HTTP_403_FORBIDDEN, "No permission for this team")
                 continue
-            data = {
-                "thing1": {"value": item.name[:20]},
-                "date3": {"value": expire_dt.strftime("%Y-%m-%d %H:%M")},
+        elif row.owner_openid != openid:
+            _fail(index, op, status.HTTP_403_FORBIDDEN, "No permission for this item")
+            continue
+
+        if op.op == "update":
+            values = {
+                field: value
+                for field, value in (
+                    op.data.model_dump(exclude_unset=True) if op.data else {}
+                ).items()
+                if field in ITEM_WRITABLE_FIELDS
             }
-            send_subscribe_message(
-                openid=openid,
-                template_id=settings.wechat_template_id,
-                data=data,
-                page="pages/index/index",
-                state="formal",
+            null_field = _null_required_field(values)
+            if null_field:
+                _fail(index, op, status.HTTP_400_BAD_REQUEST, f"{null_field} cannot be null")
+                continue
+            if "expire_date" in values:
+                values["expire_at"] = parse_expire_date(values["expire_date"])
+            values.update(id=op.id, updated_at=now)
+            updates.append(values)
+            seen_ids.add(op.id)
+            written.setdefault(op.id, []).append(index)
+        else:
+            seen_ids.add(op.id)
+            delete_ids.append(op.id)
+            results[index] = ItemBatchResult(
+                index=index, op=op.op, id=op.id, status=status.HTTP_200_OK
             )
-            sent += 1
+
+    if inserts:
+        db.execute(insert(Item), inserts)
+    if updates:
+        # 按主键批量 UPDATE
+        db.execute(update(Item), updates)
+    if delete_ids:
+        db.execute(
+            update(Item)
+            .where(Item.id.in_(delete_ids))
+            .values(deleted=True, deleted_at=now, deleted_by=openid, updated_at=now)
+        )
     db.commit()
-    return MessageResponse(message=f"notified {len(items)}, sent {sent}")
 
+    if written:
+        for item in db.scalars(select(Item).where(Item.id.in_(written.keys()))):
+            for index in written[item.id]:
+                op = operations[index]
+                results[index] = ItemBatchResult(
+                    index=index,
+                    op=op.op,
+                    id=item.id,
+                    status=status.HTTP_201_CREATED if op.op == "create" else status.HTTP_200_OK,
+                    item=ItemOut.model_validate(item),
+                )
+            _schedule_reminder(db, item)
+    for item_id in delete_ids:
+        reminder_scheduler.discard(item_id)
+
+    return ItemBatchResponse(results=results)
 
 
 @router.post("", response_model=ItemOut, status_code=status.HTTP_201_CREATED)
-def create_item(
+async def create_item(
     payload: ItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     team_id = normalize_team_id(payload.team_id)
     if team_id:
-        ensure_team_member(db, team_id, openid)
+        await db.run_sync(ensure_team_member, team_id, openid)
 
     now = datetime.now(timezone.utc)
-    existing = db.scalar(
+    existing = await db.scalar(
         select(Item).where(
             Item.owner_openid == openid,
             Item.team_id == team_id,
@@ -178,7 +583,7 @@ def create_item(
             if field == "team_id":
                 continue
             if hasattr(existing, field):
-            setattr(existing, field, value)
+                setattr(existing, field, value)
         existing.deleted = False
         existing.deleted_at = None
         existing.deleted_by = None
@@ -201,23 +606,24 @@ def create_item(
         )
         db.add(item)
 
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
+    await db.run_sync(_schedule_reminder, item)
     return item
 
 
 @router.patch("/{item_id}", response_model=ItemOut)
-def update_item(
+async def update_item(
     item_id: str,
     payload: ItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    item = db.get(Item, item_id)
+    item = await db.get(Item, item_id)
     if not item or item.deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    ensure_item_permission(db, item, openid)
+    await db.run_sync(ensure_item_permission, item, openid)
     
     # 使用 exclude_unset=True 只更新提交的字段
     # 不使用 by_alias，因为数据库字段名是 product_image 而不是 productImage
@@ -241,22 +647,23 @@ def update_item(
     
     item.updated_at = datetime.now(timezone.utc)
 
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
+    await db.run_sync(_schedule_reminder, item)
     return item
 
 
 @router.patch("/{item_id}/delete", response_model=MessageResponse)
-def delete_item(
+async def delete_item(
     item_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    item = db.get(Item, item_id)
+    item = await db.get(Item, item_id)
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    ensure_item_permission(db, item, openid)
+    await db.run_sync(ensure_item_permission, item, openid)
 
     now = datetime.now(timezone.utc)
     item.deleted = True
@@ -264,21 +671,24 @@ def delete_item(
     item.deleted_by = openid
     item.updated_at = now
 
-    db.commit()
+    await db.commit()
+    reminder_scheduler.discard(item_id)
     return MessageResponse()
 
 
 @router.patch("/{item_id}/unnotify", response_model=MessageResponse)
-def unnotify_item(
+async def unnotify_item(
     item_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    item = db.get(Item, item_id)
+    item = await db.get(Item, item_id)
     if not item or item.deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
-    ensure_item_permission(db, item, openid)
+    await db.run_sync(ensure_item_permission, item, openid)
     item.notified_at = None
-    db.commit()
+    item.updated_at = datetime.now(timezone.utc)
+    await db.commit()
+    await db.run_sync(_schedule_reminder, item)
     return MessageResponse(message="unnotified")
 
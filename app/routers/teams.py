@@ -4,13 +4,14 @@ from datetime import datetime, timezone
 from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth import get_current_openid
+from ..cache import invalidate_membership
 from ..config import settings
-from ..database import get_db
-from ..models import Team
+from ..database import get_async_db
+from ..models import Item, Team, TeamMember
 from ..schemas import (
     JoinTeamRequest,
     MessageResponse,
@@ -30,15 +31,20 @@ def generate_invite_code(length: int) -> str:
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
-def get_team_or_404(db: Session, team_id: str) -> Team:
-    team = db.get(Team, team_id)
+async def get_team_or_404(db: AsyncSession, team_id: str) -> Team:
+    team = await db.get(Team, team_id)
     if not team:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Team not found")
     return team
 
 
-def ensure_team_member(team: Team, openid: str) -> None:
-    if openid not in team.member_openids:
+async def is_team_member(db: AsyncSession, team_id: str, openid: str) -> bool:
+    """按 (team_id, openid) 主键判断成员身份。"""
+    return await db.get(TeamMember, (team_id, openid)) is not None
+
+
+async def ensure_team_member(db: AsyncSession, team: Team, openid: str) -> None:
+    if not await is_team_member(db, team.id, openid):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
 
@@ -47,132 +53,150 @@ def ensure_team_owner(team: Team, openid: str) -> None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Owner only")
 
 
-def _cleanup_user_teams(db: Session, openid: str, keep_team_id: str | None = None) -> None:
-    """确保用户只在一个团队中：删除自己创建的团队，退出其他团队，保留 keep_team_id。"""
-    all_teams = db.scalars(select(Team)).all()
-    for t in all_teams:
-        if t.id == keep_team_id:
-            continue
-        if t.owner_openid == openid:
-            db.delete(t)
-        elif openid in t.member_openids:
-            t.member_openids = [m for m in t.member_openids if m != openid]
-    db.commit()
+async def _cleanup_user_teams(
+    db: AsyncSession, openid: str, keep_team_id: str | None = None
+) -> list[str]:
+    """
+    确保用户只在一个团队中：删除自己创建的团队，退出其他团队，保留 keep_team_id。
+
+    只按 owner_openid / team_members.openid 索引处理该用户相关的团队，不提交，
+    由调用方与创建/加入在同一事务中提交。返回被删除的团队 id，供提交后清理成员缓存。
+    """
+    owned_stmt = select(Team.id).where(Team.owner_openid == openid)
+    membership_filter = [TeamMember.openid == openid]
+    if keep_team_id:
+        owned_stmt = owned_stmt.where(Team.id != keep_team_id)
+        membership_filter.append(TeamMember.team_id != keep_team_id)
+
+    owned_ids = list(await db.scalars(owned_stmt))
+    if owned_ids:
+        # 与 Team 的 ORM 级联一致：团队物品、成员随团队一起删除
+        await db.execute(delete(Item).where(Item.team_id.in_(owned_ids)))
+        await db.execute(delete(TeamMember).where(TeamMember.team_id.in_(owned_ids)))
+        await db.execute(delete(Team).where(Team.id.in_(owned_ids)))
+    await db.execute(delete(TeamMember).where(*membership_filter))
+    return owned_ids
 
 
 @router.get("", response_model=TeamsResponse)
-def list_teams(
+async def list_teams(
     type: Literal["created", "joined"] = Query("created"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     if type == "created":
         stmt = select(Team).where(Team.owner_openid == openid)
-        teams = db.scalars(stmt).all()
+        teams = (await db.scalars(stmt)).all()
     else:
-        stmt = select(Team)
-        teams = [team for team in db.scalars(stmt).all() if openid in team.member_openids]
+        stmt = (
+            select(Team)
+            .join(TeamMember, TeamMember.team_id == Team.id)
+            .where(TeamMember.openid == openid)
+        )
+        teams = (await db.scalars(stmt)).all()
 
     return TeamsResponse(teams=teams)
 
 
 @router.get("/{team_id}", response_model=TeamResponse)
-def get_team(
+async def get_team(
     team_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    team = get_team_or_404(db, team_id)
-    ensure_team_member(team, openid)
+    team = await get_team_or_404(db, team_id)
+    await ensure_team_member(db, team, openid)
     return TeamResponse(team=team)
 
 
 @router.post("", response_model=TeamOut, status_code=status.HTTP_201_CREATED)
-def create_team(
+async def create_team(
     payload: TeamCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    # 用户只能拥有/加入一个团队：先清理其他团队关系
-    _cleanup_user_teams(db, openid)
+    # 用户只能拥有/加入一个团队：先清理其他团队关系，与创建在同一事务中提交
+    removed_team_ids = await _cleanup_user_teams(db, openid)
 
     invite_code = payload.invite_code or generate_invite_code(settings.invite_code_length)
     team = Team(
         name=payload.name,
         owner_openid=openid,
-        member_openids=[openid],
+        members=[TeamMember(openid=openid)],
         invite_code=invite_code,
         quota=payload.quota or 5,
         created_at=datetime.now(timezone.utc),
     )
     db.add(team)
-    db.commit()
-    db.refresh(team)
+    await db.commit()
+    invalidate_membership(team_ids=removed_team_ids, openids=[openid])
+    await db.refresh(team)
     return team
 
 
 @router.post("/join", response_model=TeamOut)
-def join_team(
+async def join_team(
     payload: JoinTeamRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    team = db.scalar(select(Team).where(Team.invite_code == payload.invite_code))
+    team = await db.scalar(select(Team).where(Team.invite_code == payload.invite_code))
     if not team:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid invite code")
 
-    if openid in team.member_openids:
+    if await is_team_member(db, team.id, openid):
         return team
 
-    if len(team.member_openids) >= team.quota:
+    if len(team.members) >= team.quota:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Team quota exceeded")
 
-    # 加入前先清理用户在其他团队的拥有/成员关系，确保只在一个团队中
-    _cleanup_user_teams(db, openid, keep_team_id=team.id)
+    # 加入前先清理用户在其他团队的拥有/成员关系，确保只在一个团队中（与加入同一事务）
+    removed_team_ids = await _cleanup_user_teams(db, openid, keep_team_id=team.id)
 
-    team.member_openids.append(openid)
-    db.commit()
-    db.refresh(team)
+    team.members.append(TeamMember(openid=openid))
+    await db.commit()
+    invalidate_membership(team_ids=removed_team_ids, openids=[openid])
+    await db.refresh(team)
     return team
 
 
 @router.patch("/{team_id}/rename", response_model=TeamOut)
-def rename_team(
+async def rename_team(
     team_id: str,
     payload: RenameTeamRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    team = get_team_or_404(db, team_id)
+    team = await get_team_or_404(db, team_id)
     ensure_team_owner(team, openid)
     team.name = payload.name
-    db.commit()
-    db.refresh(team)
+    await db.commit()
+    await db.refresh(team)
     return team
 
 
 @router.patch("/{team_id}/regenerate-invite", response_model=TeamOut)
-def regenerate_invite(
+async def regenerate_invite(
     team_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    team = get_team_or_404(db, team_id)
+    team = await get_team_or_404(db, team_id)
     ensure_team_owner(team, openid)
     team.invite_code = generate_invite_code(settings.invite_code_length)
-    db.commit()
-    db.refresh(team)
+    await db.commit()
+    await db.refresh(team)
     return team
 
 
 @router.patch("/{team_id}/remove-member", response_model=TeamOut)
-def remove_member(
+async def remove_member(
     team_id: str,
     payload: RemoveMemberRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    team = get_team_or_404(db, team_id)
+    team = await get_team_or_404(db, team_id)
     ensure_team_owner(team, openid)
 
     if payload.member_openid == team.owner_openid:
@@ -180,26 +204,30 @@ def remove_member(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Owner cannot be removed"
         )
 
-    if payload.member_openid in team.member_openids:
-        team.member_openids.remove(payload.member_openid)
-        db.commit()
-        db.refresh(team)
+    member = await db.get(TeamMember, (team.id, payload.member_openid))
+    if member:
+        await db.delete(member)
+        await db.commit()
+        invalidate_membership(openids=[payload.member_openid])
+        await db.refresh(team)
     return team
 
 
 @router.patch("/{team_id}/leave", response_model=MessageResponse)
-def leave_team(
+async def leave_team(
     team_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
-    team = get_team_or_404(db, team_id)
+    team = await get_team_or_404(db, team_id)
     if team.owner_openid == openid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Owner cannot leave directly"
         )
-    if openid in team.member_openids:
-        team.member_openids.remove(openid)
-        db.commit()
+    member = await db.get(TeamMember, (team.id, openid))
+    if member:
+        await db.delete(member)
+        await db.commit()
+        invalidate_membership(openids=[openid])
     return MessageResponse()
 
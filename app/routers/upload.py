@@ -13,6 +13,7 @@ import io
 
 from ..auth import get_current_openid
 from ..logger import logger
+from ..metrics import IMAGE_COMPRESS_DURATION
 from ..response import success_response, error_response, ResponseCode
 
 router = APIRouter(prefix="/upload", tags=["upload"])
@@ -99,7 +100,8 @@ async def upload_product_image(
             )
         
         # 压缩图片
-        compressed_data = compress_image(file_data)
+        with IMAGE_COMPRESS_DURATION.time():
+            compressed_data = compress_image(file_data)
         
         # 生成文件名：日期/UUID.jpg
         date_dir = datetime.now().strftime('%Y%m')
@@ -3,12 +3,13 @@ from datetime import datetime, timezone
 from typing import List
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth import get_current_openid
-from ..database import get_db
+from ..database import get_async_db
+from ..etag import conditional_response, scope_version
 from ..models import WardrobeCategory, WardrobeItem, WardrobeOutfit
 from ..schemas import (
     MessageResponse,
@@ -25,28 +26,53 @@ from ..schemas import (
     WardrobeOutfitsResponse,
     WardrobeOutfitUpdate,
 )
+from ..serializers import ListProjection, list_response
 
 router = APIRouter(prefix="/wardrobe", tags=["wardrobe"])
 
+WARDROBE_ITEM_OUT_PROJECTION = ListProjection(
+    WardrobeItemOut,
+    WardrobeItem,
+    category_name=func.coalesce(WardrobeCategory.name, "未知"),
+)
+
 
 # ============ Categories APIs ============
 
 @router.get("/categories", response_model=WardrobeCategoriesResponse)
-def get_categories(
-    db: Session = Depends(get_db),
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """获取用户的所有衣服分类，并统计每个分类下的衣服数量"""
-    categories = db.scalars(
-        select(WardrobeCategory)
-        .where(WardrobeCategory.owner_openid == openid)
-        .order_by(WardrobeCategory.sort_order, WardrobeCategory.created_at)
+    # 分类或衣服（影响数量）任一变化都会改变 ETag
+    not_modified = conditional_response(
+        request,
+        response,
+        "wardrobe_categories",
+        openid,
+        *await scope_version(db, WardrobeCategory, WardrobeCategory.owner_openid == openid),
+        *await scope_version(
+            db, WardrobeItem, WardrobeItem.owner_openid == openid, WardrobeItem.deleted == False
+        ),
+    )
+    if not_modified:
+        return not_modified
+
+    categories = (
+        await db.scalars(
+            select(WardrobeCategory)
+            .where(WardrobeCategory.owner_openid == openid)
+            .order_by(WardrobeCategory.sort_order, WardrobeCategory.created_at)
+        )
     ).all()
     
     # 统计每个分类下的衣服数量
     result = []
     for cat in categories:
-        count = db.scalar(
+        count = await db.scalar(
             select(func.count(WardrobeItem.id))
             .where(
                 WardrobeItem.category_id == cat.id,
@@ -69,14 +95,14 @@ def get_categories(
 
 
 @router.post("/categories", response_model=WardrobeCategoryOut, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     payload: WardrobeCategoryCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """创建新的衣服分类"""
     # 检查是否重名
-    existing = db.scalar(
+    existing = await db.scalar(
         select(WardrobeCategory).where(
             WardrobeCategory.owner_openid == openid,
             WardrobeCategory.name == payload.name
@@ -88,29 +114,33 @@ def create_category(
             detail="分类名称已存在"
         )
     
+    # created_at 沿用数据库默认值（会话时区），与存量数据一致、排序不乱；
+    # updated_at 显式写入 UTC，供 ETag 判断最近写入是否已满 ETAG_SETTLE_SECONDS
+    now = datetime.now(timezone.utc)
     category = WardrobeCategory(
         id=str(uuid4()),
         owner_openid=openid,
         name=payload.name,
-        sort_order=payload.sort_order or 0
+        sort_order=payload.sort_order or 0,
+        updated_at=now,
     )
     db.add(category)
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     
     cat_dict = {**category.__dict__, "count": 0}
     return WardrobeCategoryOut(**cat_dict)
 
 
 @router.patch("/categories/{category_id}", response_model=WardrobeCategoryOut)
-def update_category(
+async def update_category(
     category_id: str,
     payload: WardrobeCategoryUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """更新分类信息"""
-    category = db.get(WardrobeCategory, category_id)
+    category = await db.get(WardrobeCategory, category_id)
     if not category or category.owner_openid != openid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分类不存在")
     
@@ -120,11 +150,11 @@ def update_category(
             setattr(category, field, value)
     
     category.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(category)
+    await db.commit()
+    await db.refresh(category)
     
     # 统计数量
-    count = db.scalar(
+    count = await db.scalar(
         select(func.count(WardrobeItem.id))
         .where(WardrobeItem.category_id == category_id, WardrobeItem.deleted == False)
     ) or 0
@@ -134,63 +164,73 @@ def update_category(
 
 
 @router.delete("/categories/{category_id}", response_model=MessageResponse)
-def delete_category(
+async def delete_category(
     category_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """删除分类（会级联删除该分类下的所有衣服）"""
-    category = db.get(WardrobeCategory, category_id)
+    category = await db.get(WardrobeCategory, category_id)
     if not category or category.owner_openid != openid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分类不存在")
     
-    db.delete(category)
-    db.commit()
+    await db.delete(category)
+    await db.commit()
     return MessageResponse(message="删除成功")
 
 
 # ============ Items APIs ============
 
 @router.get("/items", response_model=WardrobeItemsResponse)
-def get_items(
+async def get_items(
+    request: Request,
+    response: Response,
     category_id: str = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """获取衣服列表，可按分类筛选"""
-    query = select(WardrobeItem).where(
-        WardrobeItem.owner_openid == openid,
-        WardrobeItem.deleted == False
-    )
-    
+    criteria = [WardrobeItem.owner_openid == openid, WardrobeItem.deleted == False]
     if category_id:
-        query = query.where(WardrobeItem.category_id == category_id)
-    
-    query = query.order_by(WardrobeItem.created_at.desc())
-    items = db.scalars(query).all()
-    
-    # 附加分类名称
-    result = []
-    for item in items:
-        category = db.get(WardrobeCategory, item.category_id)
-        item_dict = {**item.__dict__, "category_name": category.name if category else "未知"}
-        result.append(WardrobeItemOut(**item_dict))
-    
-    return WardrobeItemsResponse(items=result)
+        criteria.append(WardrobeItem.category_id == category_id)
+
+    # 响应包含分类名称，分类变化也要让 ETag 失效
+    not_modified = conditional_response(
+        request,
+        response,
+        "wardrobe_items",
+        openid,
+        category_id,
+        *await scope_version(db, WardrobeItem, *criteria),
+        *await scope_version(db, WardrobeCategory, WardrobeCategory.owner_openid == openid),
+    )
+    if not_modified:
+        return not_modified
+
+    # 分类名称随列表一次 LEFT JOIN 查出，按别名直接输出
+    query = (
+        WARDROBE_ITEM_OUT_PROJECTION.select()
+        .outerjoin(WardrobeCategory, WardrobeCategory.id == WardrobeItem.category_id)
+        .where(*criteria)
+        .order_by(WardrobeItem.created_at.desc())
+    )
+    items = await WARDROBE_ITEM_OUT_PROJECTION.rows_async(db, query)
+    return list_response(response, {"items": items})
 
 
 @router.post("/items", response_model=WardrobeItemOut, status_code=status.HTTP_201_CREATED)
-def create_item(
+async def create_item(
     payload: WardrobeItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """创建新衣服"""
     # 验证分类是否存在且属于当前用户
-    category = db.get(WardrobeCategory, payload.category_id)
+    category = await db.get(WardrobeCategory, payload.category_id)
     if not category or category.owner_openid != openid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="分类不存在")
     
+    now = datetime.now(timezone.utc)
     item = WardrobeItem(
         id=str(uuid4()),
         owner_openid=openid,
@@ -204,25 +244,26 @@ def create_item(
         purchase_date=payload.purchase_date,
         image_url=payload.image_url,
         note=payload.note,
-        deleted=False
+        deleted=False,
+        updated_at=now,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     
     item_dict = {**item.__dict__, "category_name": category.name}
     return WardrobeItemOut(**item_dict)
 
 
 @router.patch("/items/{item_id}", response_model=WardrobeItemOut)
-def update_item(
+async def update_item(
     item_id: str,
     payload: WardrobeItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """更新衣服信息"""
-    item = db.get(WardrobeItem, item_id)
+    item = await db.get(WardrobeItem, item_id)
     if not item or item.owner_openid != openid or item.deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="衣服不存在")
     
@@ -232,55 +273,72 @@ def update_item(
             setattr(item, field, value)
     
     item.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     
-    category = db.get(WardrobeCategory, item.category_id)
+    category = await db.get(WardrobeCategory, item.category_id)
     item_dict = {**item.__dict__, "category_name": category.name if category else "未知"}
     return WardrobeItemOut(**item_dict)
 
 
 @router.delete("/items/{item_id}", response_model=MessageResponse)
-def delete_item(
+async def delete_item(
     item_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """删除衣服（软删除）"""
-    item = db.get(WardrobeItem, item_id)
+    item = await db.get(WardrobeItem, item_id)
     if not item or item.owner_openid != openid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="衣服不存在")
     
+    now = datetime.now(timezone.utc)
     item.deleted = True
-    item.deleted_at = datetime.now(timezone.utc)
-    db.commit()
+    item.deleted_at = now
+    item.updated_at = now
+    await db.commit()
     return MessageResponse(message="删除成功")
 
 
 # ============ Outfits APIs ============
 
 @router.get("/outfits", response_model=WardrobeOutfitsResponse)
-def get_outfits(
-    db: Session = Depends(get_db),
+async def get_outfits(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """获取所有搭配方案"""
-    outfits = db.scalars(
-        select(WardrobeOutfit)
-        .where(WardrobeOutfit.owner_openid == openid)
-        .order_by(WardrobeOutfit.created_at.desc())
+    not_modified = conditional_response(
+        request,
+        response,
+        "wardrobe_outfits",
+        openid,
+        *await scope_version(db, WardrobeOutfit, WardrobeOutfit.owner_openid == openid),
+    )
+    if not_modified:
+        return not_modified
+
+    outfits = (
+        await db.scalars(
+            select(WardrobeOutfit)
+            .where(WardrobeOutfit.owner_openid == openid)
+            .order_by(WardrobeOutfit.created_at.desc())
+        )
     ).all()
     
     return WardrobeOutfitsResponse(outfits=outfits)
 
 
 @router.post("/outfits", response_model=WardrobeOutfitOut, status_code=status.HTTP_201_CREATED)
-def create_outfit(
+async def create_outfit(
     payload: WardrobeOutfitCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """创建新搭配方案"""
+    now = datetime.now(timezone.utc)
     outfit = WardrobeOutfit(
         id=str(uuid4()),
         owner_openid=openid,
@@ -288,24 +346,25 @@ def create_outfit(
         items=payload.items,
         occasion=payload.occasion,
         season=payload.season,
-        image_url=payload.image_url
+        image_url=payload.image_url,
+        updated_at=now,
     )
     db.add(outfit)
-    db.commit()
-    db.refresh(outfit)
+    await db.commit()
+    await db.refresh(outfit)
     
     return WardrobeOutfitOut(**outfit.__dict__)
 
 
 @router.patch("/outfits/{outfit_id}", response_model=WardrobeOutfitOut)
-def update_outfit(
+async def update_outfit(
     outfit_id: str,
     payload: WardrobeOutfitUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """更新搭配方案"""
-    outfit = db.get(WardrobeOutfit, outfit_id)
+    outfit = await db.get(WardrobeOutfit, outfit_id)
     if not outfit or outfit.owner_openid != openid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="搭配方案不存在")
     
@@ -315,23 +374,23 @@ def update_outfit(
             setattr(outfit, field, value)
     
     outfit.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(outfit)
+    await db.commit()
+    await db.refresh(outfit)
     
     return WardrobeOutfitOut(**outfit.__dict__)
 
 
 @router.delete("/outfits/{outfit_id}", response_model=MessageResponse)
-def delete_outfit(
+async def delete_outfit(
     outfit_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     openid: str = Depends(get_current_openid),
 ):
     """删除搭配方案"""
-    outfit = db.get(WardrobeOutfit, outfit_id)
+    outfit = await db.get(WardrobeOutfit, outfit_id)
     if not outfit or outfit.owner_openid != openid:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="搭配方案不存在")
     
-    db.delete(outfit)
-    db.commit()
+    await db.delete(outfit)
+    await db.commit()
     return MessageResponse(message="删除成功")
@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from typing import List, Optional
+from typing import List, Literal, Optional
 from decimal import Decimal
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -52,6 +52,47 @@ class ItemOut(ItemBase):
 
 class ItemsResponse(BaseModel):
     items: List[ItemOut]
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ItemTombstone(BaseModel):
+    id: str
+    deleted_at: Optional[datetime] = Field(default=None, alias="deletedAt")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ItemChangesResponse(BaseModel):
+    items: List[ItemOut]
+    deleted: List[ItemTombstone]
+    sync_token: Optional[str] = Field(default=None, alias="syncToken")
+    has_more: bool = Field(default=False, alias="hasMore")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ItemBatchOperation(BaseModel):
+    """批量操作中的一条：create 用 data 新建；update 用 id + data 更新；delete 用 id 删除。"""
+
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None
+    data: Optional[ItemUpdate] = None
+
+
+class ItemBatchRequest(BaseModel):
+    operations: List[ItemBatchOperation] = Field(min_length=1, max_length=200)
+
+
+class ItemBatchResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[str] = None
+    status: int
+    detail: Optional[str] = None
+    item: Optional[ItemOut] = None
+
+
+class ItemBatchResponse(BaseModel):
+    results: List[ItemBatchResult]
 
 
 class TeamBase(BaseModel):
@@ -241,3 +282,58 @@ class WardrobeOutfitOut(WardrobeOutfitBase):
 class WardrobeOutfitsResponse(BaseModel):
     outfits: List[WardrobeOutfitOut]
 
+
+
+# ============ Admin schemas ============
+class NotifierLeaseOut(BaseModel):
+    holder: Optional[str] = None
+    acquired_at: Optional[datetime] = Field(default=None, alias="acquiredAt")
+    renewed_at: Optional[datetime] = Field(default=None, alias="renewedAt")
+    expires_at: Optional[datetime] = Field(default=None, alias="expiresAt")
+    current_process: str = Field(alias="currentProcess")
+    is_leader: bool = Field(alias="isLeader")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class CacheStatsOut(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float = Field(alias="hitRate")
+    size: int
+    maxsize: int
+    ttl_seconds: float = Field(alias="ttlSeconds")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class PoolStatsOut(BaseModel):
+    size: int
+    checked_in: int = Field(alias="checkedIn")
+    checked_out: int = Field(alias="checkedOut")
+    overflow: int
+    checkouts: int
+    timeouts: int
+    avg_wait_ms: float = Field(alias="avgWaitMs")
+    max_wait_ms: float = Field(alias="maxWaitMs")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class DatabasePoolsOut(BaseModel):
+    sync: PoolStatsOut
+    async_: PoolStatsOut = Field(alias="async")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class LatencyStatsOut(BaseModel):
+    label: str
+    count: int
+    total_ms: float = Field(alias="totalMs")
+    avg_ms: float = Field(alias="avgMs")
+    max_ms: float = Field(alias="maxMs")
+    p50_ms: float = Field(alias="p50Ms")
+    p95_ms: float = Field(alias="p95Ms")
+    p99_ms: float = Field(alias="p99Ms")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class SqlStatsOut(BaseModel):
+    statements: List[LatencyStatsOut]
@@ -0,0 +1,56 @@
+"""
+列表接口快速序列化
+- 只查询 schema 暴露的列，按字段别名 label，结果直接是响应所需的 dict
+- 不构造 ORM 对象（无身份映射开销），也不经过 response_model 的逐行校验
+- 输出与 response_model 路径一致：字段顺序、别名、Decimal 序列化为字符串
+"""
+from decimal import Decimal
+from typing import Any, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Numeric, Result, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .response import FastJSONResponse
+
+
+class ListProjection:
+    """按 schema 字段从模型中选取列的投影，extra 为模型上没有的计算列（按字段名传入）。"""
+
+    def __init__(self, schema: Type[BaseModel], model, **extra: Any):
+        self.columns = []
+        self._decimal_keys = []
+        for name, field in schema.model_fields.items():
+            column = extra[name] if name in extra else getattr(model, name)
+            key = field.alias or name
+            self.columns.append(column.label(key))
+            if isinstance(getattr(column, "type", None), Numeric) and column.type.asdecimal:
+                self._decimal_keys.append(key)
+
+    def select(self) -> Select:
+        return select(*self.columns)
+
+    def rows(self, db: Session, stmt: Select) -> list[dict]:
+        return self._to_dicts(db.execute(stmt))
+
+    async def rows_async(self, db: AsyncSession, stmt: Select) -> list[dict]:
+        return self._to_dicts(await db.execute(stmt))
+
+    def _to_dicts(self, result: Result) -> list[dict]:
+        rows = [dict(row) for row in result.mappings()]
+        # pydantic 的 JSON 模式把 Decimal 输出为字符串，这里保持一致
+        for key in self._decimal_keys:
+            for row in rows:
+                value = row[key]
+                if isinstance(value, Decimal):
+                    row[key] = str(value)
+        return rows
+
+
+def list_response(response: Response, content: dict) -> FastJSONResponse:
+    """直接返回序列化好的响应，并带上路由中已设置的响应头（如 ETag）。"""
+    result = FastJSONResponse(content)
+    result.headers.raw.extend(response.headers.raw)
+    return result
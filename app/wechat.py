@@ -1,15 +1,35 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from functools import partial
+from typing import Any, Dict, Iterable, Optional
 
 import logging
 import requests
 from fastapi import HTTPException, status
+from requests.adapters import HTTPAdapter
 
 from .config import settings
 
 logger = logging.getLogger("app.wechat")
 
 _token_cache: Dict[str, Any] = {"token": None, "expire_at": None}
+_token_lock = threading.Lock()
+
+# 复用 keep-alive 连接，连接池大小与发送并发数一致
+_session = requests.Session()
+_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.wechat_send_concurrency,
+    ),
+)
+_send_executor = ThreadPoolExecutor(
+    max_workers=settings.wechat_send_concurrency, thread_name_prefix="wechat-send"
+)
 
 
 def _fetch_access_token() -> str:
@@ -22,7 +42,7 @@ def _fetch_access_token() -> str:
         "https://api.weixin.qq.com/cgi-bin/token"
         f"?grant_type=client_credential&appid={settings.wechat_appid}&secret={settings.wechat_secret}"
     )
-    resp = requests.get(url, timeout=5)
+    resp = _session.get(url, timeout=5)
     resp.raise_for_status()
     data = resp.json()
     if "errcode" in data and data["errcode"] != 0:
@@ -45,7 +65,13 @@ def get_access_token() -> str:
     expire_at: Optional[datetime] = _token_cache.get("expire_at")
     if token and expire_at and expire_at > datetime.now(timezone.utc):
         return token
-    return _fetch_access_token()
+    # 并发发送时只让一个线程去刷新 token
+    with _token_lock:
+        token = _token_cache.get("token")
+        expire_at = _token_cache.get("expire_at")
+        if token and expire_at and expire_at > datetime.now(timezone.utc):
+            return token
+        return _fetch_access_token()
 
 
 def send_subscribe_message(
@@ -75,7 +101,7 @@ def send_subscribe_message(
     if page:
         payload["page"] = page
 
-    resp = requests.post(url, json=payload, timeout=5)
+    resp = _session.post(url, json=payload, timeout=5)
     resp.raise_for_status()
     result = resp.json()
     if result.get("errcode") != 0:
@@ -86,3 +112,73 @@ def send_subscribe_message(
         )
     return result
 
+
+
+@dataclass
+class SubscribeMessage:
+    """待发送的一条订阅消息，key 用于调用方回查（如物品 id）。"""
+
+    openid: Optional[str]
+    template_id: Optional[str]
+    data: Dict[str, Any]
+    page: Optional[str] = None
+    state: str = "formal"
+    lang: str = "zh_CN"
+    key: Optional[str] = None
+
+
+@dataclass
+class SendReport:
+    """批量发送结果统计。"""
+
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0
+    sent_keys: list[str] = field(default_factory=list)
+
+
+async def send_subscribe_messages(messages: Iterable[SubscribeMessage]) -> SendReport:
+    """
+    并发发送订阅消息，最多 WECHAT_SEND_CONCURRENCY 条同时在途。
+
+    并发上限由发送线程池和 HTTP 连接池共同决定，二者在启动时按该配置创建，因此不接受调用方覆盖。
+
+    单条失败只记入 failed，不影响同批其他消息；缺少 openid/templateId 的计入 skipped。
+    """
+    semaphore = asyncio.Semaphore(settings.wechat_send_concurrency)
+    loop = asyncio.get_running_loop()
+    report = SendReport()
+
+    async def _send_one(message: SubscribeMessage) -> None:
+        if not message.openid or not message.template_id:
+            report.skipped += 1
+            return
+        async with semaphore:
+            try:
+                await loop.run_in_executor(
+                    _send_executor,
+                    partial(
+                        send_subscribe_message,
+                        openid=message.openid,
+                        template_id=message.template_id,
+                        data=message.data,
+                        page=message.page,
+                        state=message.state,
+                        lang=message.lang,
+                    ),
+                )
+            except Exception as exc:
+                report.failed += 1
+                logger.warning("subscribe send to %s failed: %s", message.openid, exc)
+                return
+        report.sent += 1
+        if message.key is not None:
+            report.sent_keys.append(message.key)
+
+    await asyncio.gather(*(_send_one(message) for message in messages))
+    return report
+
+
+def send_subscribe_messages_sync(messages: Iterable[SubscribeMessage]) -> SendReport:
+    """在没有事件循环的线程中（同步路由、notifier 线程）调用批量发送。"""
+    return asyncio.run(send_subscribe_messages(messages))
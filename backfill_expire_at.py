@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+将 items.expire_date（字符串）回填到类型化的 items.expire_at 字段
+
+按主键分批处理，每批独立提交，可重复执行（只处理 expire_at 为空的行）
+使用方法: python3 backfill_expire_at.py [批大小，默认 1000]
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select, update
+from app.database import SessionLocal
+from app.models import Item, parse_expire_date
+
+
+def backfill(chunk_size: int = 1000) -> None:
+    last_id = ""
+    scanned = 0
+    filled = 0
+    with SessionLocal() as db:
+        while True:
+            rows = db.execute(
+                select(Item.id, Item.expire_date, Item.updated_at)
+                .where(
+                    Item.id > last_id,
+                    Item.expire_at.is_(None),
+                    Item.expire_date.is_not(None),
+                )
+                .order_by(Item.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+
+            params = []
+            for row in rows:
+                expire_at = parse_expire_date(row.expire_date)
+                if expire_at:
+                    # 显式带回 updated_at，避免 onupdate 刷新修改时间
+                    params.append(
+                        {"id": row.id, "expire_at": expire_at, "updated_at": row.updated_at}
+                    )
+            if params:
+                # 按主键批量 UPDATE，不加载 ORM 对象
+                db.execute(update(Item), params)
+                db.commit()
+                filled += len(params)
+            print(f"已扫描 {scanned} 行，回填 {filled} 行")
+
+    print(f"回填完成：扫描 {scanned} 行，回填 {filled} 行，无法解析 {scanned - filled} 行")
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    backfill(size)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+基准测试：JSONResponse（标准库 json）与 FastJSONResponse（orjson）的序列化耗时
+
+两条路径各比较一次，并确认两种响应类输出的字节完全一致：
+  - response_model 路由：FastAPI 先把返回值转换为 JSON 模式的 dict，再交给响应类渲染，
+    这里用 5k 条物品的 ItemsResponse
+  - ResponseUtil / success_response：直接传入含 datetime、Decimal 价格的原始 dict，
+    标准做法需先经 jsonable_encoder，这里用 5k 条衣橱物品
+不连接数据库。
+
+使用方法: python3 bench_json_response.py [--items 5000] [--repeat 20]
+"""
+import argparse
+import sys
+import timeit
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.response import FastJSONResponse, orjson
+from app.schemas import ItemsResponse, WardrobeItemOut
+
+
+def items_content(count: int) -> dict:
+    """response_model 路径交给响应类的内容：JSON 模式、按别名输出。"""
+    now = datetime(2026, 1, 2, 8, 30, 1, 123456, tzinfo=timezone.utc)
+    response = ItemsResponse(
+        items=[
+            {
+                "id": f"item-{i:05d}",
+                "name": f"牛奶{i}",
+                "owner_openid": "bench-user",
+                "expire_date": "2026-01-20",
+                "quantity": 1,
+                "deleted": False,
+                "deleted_at": None,
+                "deleted_by": None,
+                "addDate": now,
+                "updateDate": now,
+                "notifiedAt": None,
+            }
+            for i in range(count)
+        ],
+        nextCursor="bench-cursor",
+    )
+    return response.model_dump(mode="json", by_alias=True)
+
+
+def wardrobe_content(count: int) -> dict:
+    """ResponseUtil 路径传入的原始内容：含 datetime、date 与 Decimal。"""
+    now = datetime(2026, 1, 2, 8, 30, 1, 123456, tzinfo=timezone.utc)
+    items = [
+        WardrobeItemOut(
+            id=f"wardrobe-{i:05d}",
+            categoryId="tops",
+            name=f"衬衫{i}",
+            price=Decimal("199.90"),
+            purchaseDate=date(2025, 12, 1),
+            ownerOpenid="bench-user",
+            deleted=False,
+            createdAt=now,
+            updatedAt=now,
+        ).model_dump(by_alias=True)
+        for i in range(count)
+    ]
+    return {"code": 200, "message": "操作成功", "data": {"items": items}}
+
+
+def bench(name: str, baseline, fast, repeat: int) -> None:
+    baseline_body, fast_body = baseline(), fast()
+    identical = "一致" if baseline_body == fast_body else "不一致"
+    baseline_ms = min(timeit.repeat(baseline, number=repeat, repeat=5)) / repeat * 1000
+    fast_ms = min(timeit.repeat(fast, number=repeat, repeat=5)) / repeat * 1000
+    print(f"{name}（{len(fast_body) / 1024 / 1024:.2f} MB，输出{identical}）")
+    print(f"  JSONResponse      {baseline_ms:>8.2f} ms")
+    print(f"  FastJSONResponse  {fast_ms:>8.2f} ms  ({baseline_ms / fast_ms:.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比较 JSONResponse 与 FastJSONResponse 的序列化耗时")
+    parser.add_argument("--items", type=int, default=5000, help="列表条数")
+    parser.add_argument("--repeat", type=int, default=20, help="每轮渲染次数")
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("未安装 orjson，FastJSONResponse 退回标准库 json，两条路径耗时相同")
+
+    items = items_content(args.items)
+    bench(
+        f"response_model 路由：{args.items} 条 ItemsResponse",
+        lambda: JSONResponse(items).body,
+        lambda: FastJSONResponse(items).body,
+        args.repeat,
+    )
+
+    wardrobe = wardrobe_content(args.items)
+    bench(
+        f"ResponseUtil：{args.items} 条衣橱物品（含 Decimal 价格）",
+        lambda: JSONResponse(jsonable_encoder(wardrobe)).body,
+        lambda: FastJSONResponse(wardrobe).body,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
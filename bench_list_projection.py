@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+基准测试：列表接口的列投影（ListProjection）与 ORM 对象 + response_model 的吞吐对比
+
+在临时 SQLite 库中写入物品与衣橱物品，分别按两种方式生成 GET /items、GET /wardrobe/items 的响应体：
+  - 旧做法：查询完整 ORM 对象，再按 response_model 逐行校验、序列化
+    （衣橱列表另外逐行 db.get 分类、展开 item.__dict__ 构造 WardrobeItemOut）
+  - 列投影：只查询 schema 暴露的列，结果行直接按别名输出
+两种方式的响应体逐字节比较，并输出每秒处理的行数。不连接业务数据库。
+
+依赖：应用导入时按 SQLite 连接串创建异步引擎，需额外安装 requirements.txt 之外的 aiosqlite（pip install aiosqlite）
+
+使用方法: python3 bench_list_projection.py [--rows 5000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench-list-projection-")
+# 必须在导入 app 之前设置
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/bench.db"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import insert, select
+
+from app.database import Base, SessionLocal, engine
+from app.models import Item, WardrobeCategory, WardrobeItem
+from app.response import FastJSONResponse
+from app.routers.items import ITEM_OUT_PROJECTION
+from app.routers.wardrobe import WARDROBE_ITEM_OUT_PROJECTION
+from app.schemas import ItemsResponse, WardrobeItemOut, WardrobeItemsResponse
+
+OPENID = "bench-user"
+
+
+def seed(count: int) -> None:
+    now = datetime(2026, 1, 2, 8, 30, 1)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.execute(
+            insert(Item),
+            [
+                {
+                    "id": f"item-{i:06d}",
+                    "owner_openid": OPENID,
+                    "name": f"牛奶{i}",
+                    "category": "乳制品",
+                    "expire_date": "2026-01-20",
+                    "quantity": 1,
+                    "deleted": False,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(count)
+            ],
+        )
+        db.execute(
+            insert(WardrobeCategory),
+            [{"id": f"category-{i}", "owner_openid": OPENID, "name": f"分类{i}"} for i in range(10)],
+        )
+        db.execute(
+            insert(WardrobeItem),
+            [
+                {
+                    "id": f"wardrobe-{i:06d}",
+                    "owner_openid": OPENID,
+                    "category_id": f"category-{i % 10}",
+                    "name": f"衬衫{i}",
+                    "color": "白色",
+                    "price": Decimal("199.90"),
+                    "purchase_date": date(2025, 12, 1),
+                    "deleted": False,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(count)
+            ],
+        )
+        db.commit()
+
+
+def render_model(model) -> bytes:
+    """response_model 路由：FastAPI 按 schema 校验返回值，转成 JSON 模式后交给响应类。"""
+    return FastJSONResponse(model.model_dump(mode="json", by_alias=True)).body
+
+
+def items_orm() -> bytes:
+    with SessionLocal() as db:
+        items = db.scalars(
+            select(Item)
+            .where(Item.owner_openid == OPENID, Item.deleted.is_(False))
+            .order_by(Item.updated_at.desc(), Item.id.desc())
+        ).all()
+        return render_model(ItemsResponse.model_validate({"items": items, "nextCursor": None}))
+
+
+def items_projection() -> bytes:
+    with SessionLocal() as db:
+        stmt = (
+            ITEM_OUT_PROJECTION.select()
+            .where(Item.owner_openid == OPENID, Item.deleted.is_(False))
+            .order_by(Item.updated_at.desc(), Item.id.desc())
+        )
+        return FastJSONResponse({"items": ITEM_OUT_PROJECTION.rows(db, stmt), "nextCursor": None}).body
+
+
+def wardrobe_orm() -> bytes:
+    with SessionLocal() as db:
+        items = db.scalars(
+            select(WardrobeItem)
+            .where(WardrobeItem.owner_openid == OPENID, WardrobeItem.deleted.is_(False))
+            .order_by(WardrobeItem.created_at.desc())
+        ).all()
+        result = []
+        for item in items:
+            category = db.get(WardrobeCategory, item.category_id)
+            item_dict = {**item.__dict__, "category_name": category.name if category else "未知"}
+            result.append(WardrobeItemOut(**item_dict))
+        return render_model(WardrobeItemsResponse.model_validate({"items": result}))
+
+
+def wardrobe_projection() -> bytes:
+    with SessionLocal() as db:
+        stmt = (
+            WARDROBE_ITEM_OUT_PROJECTION.select()
+            .outerjoin(WardrobeCategory, WardrobeCategory.id == WardrobeItem.category_id)
+            .where(WardrobeItem.owner_openid == OPENID, WardrobeItem.deleted.is_(False))
+            .order_by(WardrobeItem.created_at.desc())
+        )
+        return FastJSONResponse({"items": WARDROBE_ITEM_OUT_PROJECTION.rows(db, stmt)}).body
+
+
+def best_seconds(func, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(name: str, orm, projection, rows: int, repeat: int) -> None:
+    identical = "一致" if orm() == projection() else "不一致"
+    orm_seconds = best_seconds(orm, repeat)
+    projection_seconds = best_seconds(projection, repeat)
+    print(f"{name}（{rows} 行，输出{identical}）")
+    print(f"  ORM + response_model  {orm_seconds * 1000:>8.1f} ms  {rows / orm_seconds:>10,.0f} 行/秒")
+    print(
+        f"  列投影                {projection_seconds * 1000:>8.1f} ms  "
+        f"{rows / projection_seconds:>10,.0f} 行/秒  ({orm_seconds / projection_seconds:.1f}x)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比较列投影与 ORM + response_model 的列表序列化吞吐")
+    parser.add_argument("--rows", type=int, default=5000, help="物品与衣橱物品各写入的行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方式重复次数，取最快一次")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    bench("GET /items", items_orm, items_projection, args.rows, args.repeat)
+    bench("GET /wardrobe/items", wardrobe_orm, wardrobe_projection, args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+基准测试：BaseHTTPMiddleware 版与纯 ASGI 版 LoggingMiddleware 在 GET / 上的吞吐（请求/秒）
+
+两个应用只有日志中间件不同，路由与 app.main 的 GET / 相同：
+  - BaseHTTPMiddleware：重写前的实现（原样保留在本脚本中），每个请求额外创建任务与内存流
+  - 纯 ASGI：当前的 app.middleware.LoggingMiddleware
+请求直接以 ASGI 调用驱动（不经过网络与 HTTP 解析），测得的差异即中间件本身的开销；
+每轮按 --concurrency 并发发出请求，两种实现交替运行取最好成绩，并确认状态码与响应体一致。
+两者都照常写请求日志（logs/display_date.log）。不连接数据库。
+
+使用方法: python3 bench_middleware.py [--requests 5000] [--concurrency 10] [--rounds 3]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.logger import logger, shutdown_logging
+from app.middleware import LoggingMiddleware
+from app.response import ResponseCode, ResponseMessage
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """重写前的日志中间件（BaseHTTPMiddleware 实现），仅作对照。"""
+
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        method = request.method
+        url = str(request.url)
+        client_host = request.client.host if request.client else "unknown"
+        logger.info(f"请求开始 | {method} {url} | 客户端: {client_host}")
+        try:
+            response = await call_next(request)
+            process_time = time.time() - start_time
+            logger.info(
+                f"请求完成 | {method} {url} | "
+                f"状态码: {response.status_code} | "
+                f"耗时: {process_time:.3f}s"
+            )
+            response.headers["X-Process-Time"] = str(process_time)
+            return response
+        except Exception as exc:
+            process_time = time.time() - start_time
+            logger.error(
+                f"请求异常 | {method} {url} | "
+                f"耗时: {process_time:.3f}s | "
+                f"错误: {str(exc)}\n"
+                f"堆栈跟踪:\n{traceback.format_exc()}"
+            )
+            return JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={
+                    "code": ResponseCode.INTERNAL_ERROR,
+                    "message": ResponseMessage.INTERNAL_ERROR,
+                    "data": {"detail": str(exc) if logger.level == 10 else None},
+                },
+            )
+
+
+def build_app(middleware) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware)
+
+    @app.get("/", response_class=PlainTextResponse)
+    def read_root() -> str:
+        return """番茄我爱你
+
+备案信息：渝ICP备2025076154号
+"""
+
+    return app
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/",
+    "raw_path": b"/",
+    "query_string": b"",
+    "root_path": "",
+    "headers": [(b"host", b"bench"), (b"user-agent", b"bench-middleware")],
+    "client": ("127.0.0.1", 50000),
+    "server": ("bench", 80),
+}
+
+
+async def call(app) -> tuple[int, bytes]:
+    """以 ASGI 方式发出一次 GET /，返回状态码与响应体。"""
+    status_code = 0
+    body = bytearray()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # 响应结束前不会再读取；BaseHTTPMiddleware 会等待断开消息，这里挂起直到被取消
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(dict(SCOPE, headers=list(SCOPE["headers"])), receive, send)
+    return status_code, bytes(body)
+
+
+async def run_round(app, requests: int, concurrency: int) -> float:
+    """并发发出 requests 个请求，返回请求/秒。"""
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await call(app)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+async def bench(args) -> None:
+    apps = {
+        "BaseHTTPMiddleware": build_app(LegacyLoggingMiddleware),
+        "纯 ASGI": build_app(LoggingMiddleware),
+    }
+    outputs = {name: await call(app) for name, app in apps.items()}
+    identical = "一致" if len(set(outputs.values())) == 1 else "不一致"
+    print(f"GET /：{args.requests} 个请求，并发 {args.concurrency}，{args.rounds} 轮取最好（输出{identical}）")
+
+    # 预热后交替运行，避免先后顺序带来的偏差
+    for app in apps.values():
+        await run_round(app, min(args.requests, 200), args.concurrency)
+    best = {name: 0.0 for name in apps}
+    for _ in range(args.rounds):
+        for name, app in apps.items():
+            best[name] = max(best[name], await run_round(app, args.requests, args.concurrency))
+
+    baseline = best["BaseHTTPMiddleware"]
+    for name, rps in best.items():
+        print(f"  {name:<20} {rps:>9.0f} 请求/秒  ({rps / baseline:.2f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="比较两种 LoggingMiddleware 实现在 GET / 上的吞吐")
+    parser.add_argument("--requests", type=int, default=5000, help="每轮请求数")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发请求数")
+    parser.add_argument("--rounds", type=int, default=3, help="轮数")
+    args = parser.parse_args()
+    try:
+        asyncio.run(bench(args))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
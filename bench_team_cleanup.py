@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+基准测试：团队清理与成员校验的耗时与团队总数、成员总数无关
+
+在临时 SQLite 库中逐级增加团队（每个团队若干成员），测量：
+  - 创建/加入团队前的 _cleanup_user_teams：测试用户拥有一个团队、又加入了另一个团队，
+    每次执行后回滚，数据保持不变；并与旧做法（加载全部团队逐个检查）对照
+  - 团队路由的成员校验 ensure_team_member（绕过进程内缓存，每次都查库）
+不连接业务数据库。
+
+依赖：应用导入时按 SQLite 连接串创建异步引擎，需额外安装 requirements.txt 之外的 aiosqlite（pip install aiosqlite）
+
+使用方法: python3 bench_team_cleanup.py [--sizes 1000,10000,50000] [--members 4] [--repeat 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_tmp_dir = tempfile.mkdtemp(prefix="bench-team-cleanup-")
+# 必须在导入 app 之前设置
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/bench.db"
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp_dir}/bench.db"
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import insert, select
+
+from app.cache import membership_cache
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models import Item, Team, TeamMember
+from app.routers.items import ensure_team_member
+from app.routers.teams import _cleanup_user_teams
+
+OPENID = "bench-user"
+
+
+def _legacy_cleanup(db, openid: str) -> None:
+    for team in db.scalars(select(Team)).all():
+        if team.owner_openid == openid:
+            db.delete(team)
+        elif openid in team.member_openids:
+            team.members = [m for m in team.members if m.openid != openid]
+    db.flush()
+
+
+async def legacy_cleanup(db, openid: str) -> None:
+    """重写前的实现：加载全部团队，逐个判断是否拥有/加入。"""
+    await db.run_sync(_legacy_cleanup, openid)
+
+
+def _check_membership(db, openid: str) -> None:
+    membership_cache.invalidate(("team-0", openid))
+    db.expunge_all()
+    ensure_team_member(db, "team-0", openid)
+
+
+async def check_membership(db, openid: str) -> None:
+    await db.run_sync(_check_membership, openid)
+
+
+def grow(db, start: int, stop: int, members: int) -> None:
+    """追加编号 [start, stop) 的团队，每个团队 members 个成员。"""
+    db.execute(
+        insert(Team),
+        [
+            {"id": f"team-{i}", "name": f"团队{i}", "owner_openid": f"owner-{i}", "invite_code": f"c{i}"}
+            for i in range(start, stop)
+        ],
+    )
+    db.execute(
+        insert(TeamMember),
+        [
+            {"team_id": f"team-{i}", "openid": f"owner-{i}" if j == 0 else f"member-{i}-{j}"}
+            for i in range(start, stop)
+            for j in range(members)
+        ],
+    )
+
+
+def seed_user(db) -> None:
+    """测试用户拥有一个带物品的团队，并加入了另一个团队。"""
+    db.add(Team(id="bench-owned", name="自己的团队", owner_openid=OPENID, invite_code="own"))
+    db.flush()
+    db.add(TeamMember(team_id="bench-owned", openid=OPENID))
+    db.add(TeamMember(team_id="team-0", openid=OPENID))
+    db.add_all(
+        Item(name=f"物品{i}", owner_openid=OPENID, team_id="bench-owned", quantity=1)
+        for i in range(10)
+    )
+
+
+async def time_per_call(func, repeat: int) -> float:
+    """每次调用后回滚，返回平均耗时（毫秒）。"""
+    async with AsyncSessionLocal() as db:
+        await func(db, OPENID)  # 预热
+        await db.rollback()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            await func(db, OPENID)
+            await db.rollback()
+        return (time.perf_counter() - start) / repeat * 1000
+
+
+async def run(sizes: list[int], args: argparse.Namespace) -> None:
+    print(f"{'团队数':>8}  {'成员数':>8}  {'清理 ms/次':>10}  {'旧清理 ms/次':>12}  {'成员校验 ms/次':>14}")
+    cleanup_costs, check_costs = [], []
+    total = 0
+    for size in sizes:
+        with SessionLocal() as db:
+            grow(db, total, size, args.members)
+            if total == 0:
+                seed_user(db)
+            db.commit()
+        total = size
+        cleanup = await time_per_call(_cleanup_user_teams, args.repeat)
+        legacy = await time_per_call(legacy_cleanup, args.legacy_repeat)
+        check = await time_per_call(check_membership, args.repeat)
+        cleanup_costs.append(cleanup)
+        check_costs.append(check)
+        print(f"{size:>8}  {size * args.members:>8}  {cleanup:>10.3f}  {legacy:>12.1f}  {check:>14.3f}")
+    await async_engine.dispose()
+
+    print(
+        f"团队数增长 {sizes[-1] / sizes[0]:.0f} 倍：清理耗时变化 {cleanup_costs[-1] / cleanup_costs[0]:.2f} 倍，"
+        f"成员校验耗时变化 {check_costs[-1] / check_costs[0]:.2f} 倍"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="团队清理与成员校验耗时随团队总数的变化")
+    parser.add_argument("--sizes", default="1000,10000,50000", help="团队总数，逗号分隔，递增")
+    parser.add_argument("--members", type=int, default=4, help="每个团队的成员数")
+    parser.add_argument("--repeat", type=int, default=200, help="每档重复次数")
+    parser.add_argument("--legacy-repeat", type=int, default=3, help="旧做法每档重复次数")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    Base.metadata.create_all(engine)
+    asyncio.run(run(sizes, args))
+
+
+if __name__ == "__main__":
+    main()
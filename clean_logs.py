@@ -2,7 +2,7 @@
 """
 独立的日志清理工具
 
-可以手动运行或通过 cron 定期执行
+应用运行期间会在后台定期清理，本工具用于应用停止时手动清理（与运行中的应用同时执行也是安全的）
 使用方法: python3 clean_logs.py
 """
 
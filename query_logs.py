@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+日志查询工具
+
+按时间顺序流式读取 logs/ 下的当前日志与轮转日志（含 .gz），逐条过滤后输出，
+或按路由汇总请求耗时（次数、p50、p99）。逐行处理，内存占用与日志大小无关。
+
+使用方法:
+    # 某段时间内的 WARNING 及以上日志
+    python3 query_logs.py --since "2025-01-01 08:00" --until "2025-01-01 09:00" --level WARNING
+
+    # 某个请求 / 某个用户 / 某类路由的日志
+    python3 query_logs.py --request-id 3f2c...
+    python3 query_logs.py --openid oABC... --route "/items*"
+
+    # 按路由汇总耗时：应用日志中的「请求完成」行，或结构化访问日志（ACCESS_LOG_FORMAT=json）
+    python3 query_logs.py --summary
+    python3 query_logs.py --file access --summary --since 2025-01-01
+"""
+
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional, TextIO
+from urllib.parse import urlsplit
+
+# 添加项目路径到 Python 路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 只依赖标准库的统计模块，不触发应用的日志/数据库初始化
+from app.metrics import HistogramFamily
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+# 应用日志格式：%(asctime)s - %(name)s - %(levelname)s - %(message)s
+_TEXT_HEADER = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - (\S+) - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - "
+)
+# 中间件写出的请求日志：请求开始/完成/异常 | 方法 URL | ...
+_REQUEST_LINE = re.compile(r"请求(?:开始|完成|异常) \| (\S+) (\S+)")
+_REQUEST_DONE = re.compile(r"请求完成 \| (\S+) (\S+) \| 状态码: (\d+) \| 耗时: ([\d.]+)s")
+# 轮转文件名后缀中的日期：display_date.log.2025-01-01[.gz|.pending]
+_ROTATED_DATE = re.compile(r"\.log\.(\d{4}-\d{2}-\d{2})")
+# 文本日志只有原始路径，把 ID 样式的路径段归一，便于与路由模板对应
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F-]{36})$")
+
+
+@dataclass
+class LogRecord:
+    """一条日志（文本日志含后续的堆栈行）"""
+
+    time: datetime
+    level: str
+    text: str
+    method: Optional[str] = None
+    route: Optional[str] = None
+    path: Optional[str] = None
+    status: Optional[int] = None
+    latency_ms: Optional[float] = None
+    request_id: Optional[str] = None
+    openid_hash: Optional[str] = None
+
+
+def parse_time(value: str) -> datetime:
+    """解析 YYYY-MM-DD[ HH:MM[:SS]]（服务器本地时间）"""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"时间格式应为 YYYY-MM-DD[ HH:MM[:SS]]: {value}")
+
+
+def parse_until(value: str) -> datetime:
+    """结束时间只给日期时包含当天全部日志"""
+    until = parse_time(value)
+    if len(value.strip()) == len("YYYY-MM-DD"):
+        until += timedelta(days=1) - timedelta(seconds=1)
+    return until
+
+
+def openid_hash(openid: str) -> str:
+    """与中间件访问日志中的 openid_hash 算法一致"""
+    return hashlib.blake2b(openid.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def normalize_path(path: str) -> str:
+    return "/".join("{id}" if _ID_SEGMENT.match(part) else part for part in path.split("/"))
+
+
+def log_files(log_dir: Path, name: str, since: Optional[datetime], until: Optional[datetime]) -> list[Path]:
+    """
+    按时间顺序列出某个日志的轮转文件与当前文件
+
+    轮转文件名中的日期即其内容所在的日期，不在时间范围内的整个文件跳过。
+    """
+    rotated: list[tuple[date, Path]] = []
+    for file in log_dir.glob(f"{name}.log.*"):
+        if file.name.endswith(".tmp"):
+            # 压缩中的临时文件，内容不完整
+            continue
+        match = _ROTATED_DATE.search(file.name)
+        if not match:
+            continue
+        day = datetime.strptime(match.group(1), "%Y-%m-%d").date()
+        if since and day < since.date():
+            continue
+        if until and day > until.date():
+            continue
+        rotated.append((day, file))
+    rotated.sort()
+    files = [file for _, file in rotated]
+    current = log_dir / f"{name}.log"
+    if current.exists():
+        files.append(current)
+    return files
+
+
+def _open(file: Path) -> TextIO:
+    if file.name.endswith(".gz"):
+        return gzip.open(file, "rt", encoding="utf-8", errors="replace")
+    return open(file, "r", encoding="utf-8", errors="replace")
+
+
+def _text_record(time_text: str, level: str, lines: list[str]) -> LogRecord:
+    text = "".join(lines)
+    record = LogRecord(time=datetime.strptime(time_text, "%Y-%m-%d %H:%M:%S"), level=level, text=text)
+    done = _REQUEST_DONE.search(text)
+    request = done or _REQUEST_LINE.search(text)
+    if request:
+        record.method = request.group(1)
+        record.path = urlsplit(request.group(2)).path
+        record.route = normalize_path(record.path)
+    if done:
+        record.status = int(done.group(3))
+        record.latency_ms = float(done.group(4)) * 1000
+    return record
+
+
+def read_text_records(stream: TextIO) -> Iterator[LogRecord]:
+    """应用日志：以时间戳开头的行开始一条记录，之后不带时间戳的行（堆栈）归入该记录"""
+    header = None
+    lines: list[str] = []
+    for line in stream:
+        match = _TEXT_HEADER.match(line)
+        if match:
+            if header:
+                yield _text_record(header[0], header[1], lines)
+            header = (match.group(1), match.group(3))
+            lines = [line]
+        elif header:
+            lines.append(line)
+    if header:
+        yield _text_record(header[0], header[1], lines)
+
+
+def read_access_records(stream: TextIO) -> Iterator[LogRecord]:
+    """结构化访问日志：每行一条 JSON，时间为 UTC，转换为本地时间；按状态码给出级别"""
+    for line in stream:
+        try:
+            entry = json.loads(line)
+            time = datetime.fromisoformat(entry["ts"]).astimezone().replace(tzinfo=None)
+        except (ValueError, KeyError, TypeError):
+            continue
+        status = entry.get("status") or 0
+        level = "ERROR" if status >= 500 else "WARNING" if status >= 400 else "INFO"
+        yield LogRecord(
+            time=time,
+            level=level,
+            text=line,
+            method=entry.get("method"),
+            route=entry.get("route"),
+            status=status,
+            latency_ms=entry.get("latency_ms"),
+            request_id=entry.get("request_id"),
+            openid_hash=entry.get("openid_hash"),
+        )
+
+
+def matches(record: LogRecord, args: argparse.Namespace) -> bool:
+    if args.since and record.time < args.since:
+        return False
+    if args.until and record.time > args.until:
+        return False
+    if args.level and LEVELS[record.level] < LEVELS[args.level]:
+        return False
+    if args.route:
+        candidates = [value for value in (record.route, record.path) if value]
+        if not any(fnmatch.fnmatchcase(value, args.route) for value in candidates):
+            return False
+    if args.request_id:
+        # 文本日志只有异常行带请求 ID
+        if record.request_id != args.request_id and args.request_id not in record.text:
+            return False
+    if args.openid:
+        if record.openid_hash is not None:
+            if record.openid_hash != openid_hash(args.openid):
+                return False
+        elif args.openid not in record.text:
+            return False
+    return True
+
+
+def iter_records(args: argparse.Namespace) -> Iterator[LogRecord]:
+    reader = read_access_records if args.file == "access" else read_text_records
+    for file in log_files(Path(args.log_dir), args.file, args.since, args.until):
+        with _open(file) as stream:
+            for record in reader(stream):
+                if matches(record, args):
+                    yield record
+
+
+def print_summary(records: Iterator[LogRecord], out: TextIO) -> None:
+    """按 (方法, 路由) 汇总耗时；分位数按直方图桶上界估算"""
+    stats = HistogramFamily(max_series=1000)
+    for record in records:
+        if record.latency_ms is None or not record.route:
+            continue
+        stats.observe(f"{record.method} {record.route}", record.latency_ms)
+    rows = stats.snapshot()
+    rows.sort(key=lambda row: row["count"], reverse=True)
+    width = max([len(row["label"]) for row in rows] + [len("route")])
+    out.write(f"{'route':<{width}}  {'count':>8}  {'p50_ms':>9}  {'p99_ms':>9}  {'max_ms':>9}\n")
+    for row in rows:
+        out.write(
+            f"{row['label']:<{width}}  {row['count']:>8}  {row['p50_ms']:>9.1f}  "
+            f"{row['p99_ms']:>9.1f}  {row['max_ms']:>9.1f}\n"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="查询应用日志与访问日志（支持 .gz 轮转文件）")
+    parser.add_argument("--log-dir", default="logs", help="日志目录（默认 logs）")
+    parser.add_argument(
+        "--file",
+        default="display_date",
+        help="日志名：display_date（应用日志，默认）或 access（结构化访问日志）",
+    )
+    parser.add_argument("--since", type=parse_time, help="起始时间（含），本地时间")
+    parser.add_argument("--until", type=parse_until, help="结束时间（含），本地时间；只给日期时含当天")
+    parser.add_argument("--level", type=str.upper, choices=list(LEVELS), help="最低日志级别")
+    parser.add_argument("--route", help="路由模板或路径，支持通配符，如 '/items*'")
+    parser.add_argument("--request-id", help="请求 ID（X-Request-ID）")
+    parser.add_argument("--openid", help="用户 openid（访问日志中按哈希匹配）")
+    parser.add_argument("--summary", action="store_true", help="按路由汇总耗时，不输出日志内容")
+    args = parser.parse_args()
+
+    records = iter_records(args)
+    try:
+        if args.summary:
+            print_summary(records, sys.stdout)
+        else:
+            for record in records:
+                sys.stdout.write(record.text if record.text.endswith("\n") else record.text + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # 输出接到 head 等命令时提前关闭
+        sys.stderr.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())